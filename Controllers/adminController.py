@@ -420,11 +420,13 @@ def admin_items_api():
 
 def admin_item_delete(item_id):
     from Models.lostItemModel import LostItem
+    from Utils.profile_fragments import bump_content_version
     try:
         it = LostItem.objects(id=item_id).first()
         if not it:
             return jsonify({"success": False, "message": "Item not found"}), 404
         it.delete()
+        bump_content_version(it.reported_by)
         return jsonify({"success": True})
     except Exception as e:
         return jsonify({"success": False, "message": str(e)}), 500
@@ -432,12 +434,14 @@ def admin_item_delete(item_id):
 
 def admin_item_toggle_active(item_id):
     from Models.lostItemModel import LostItem
+    from Utils.profile_fragments import bump_content_version
     try:
         it = LostItem.objects(id=item_id).first()
         if not it:
             return jsonify({"success": False, "message": "Item not found"}), 404
         it.is_active = not bool(getattr(it, "is_active", True))
         it.save()
+        bump_content_version(it.reported_by)
         return jsonify({"success": True, "is_active": it.is_active})
     except Exception as e:
         return jsonify({"success": False, "message": str(e)}), 500
@@ -465,11 +469,13 @@ def admin_testimonials_api():
 
 def admin_testimonial_delete(tid):
     from Models.testimonialModel import Testimonial
+    from Utils.testimonial_pool import testimonial_pool
     try:
         t = Testimonial.objects(id=tid).first()
         if not t:
             return jsonify({"success": False, "message": "Testimonial not found"}), 404
         t.delete()
+        testimonial_pool.invalidate()
         return jsonify({"success": True})
     except Exception as e:
         return jsonify({"success": False, "message": str(e)}), 500
@@ -477,17 +483,35 @@ def admin_testimonial_delete(tid):
 
 def admin_testimonial_toggle_public(tid):
     from Models.testimonialModel import Testimonial
+    from Utils.testimonial_pool import testimonial_pool
     try:
         t = Testimonial.objects(id=tid).first()
         if not t:
             return jsonify({"success": False, "message": "Testimonial not found"}), 404
         t.is_public = not bool(getattr(t, "is_public", True))
         t.save()
+        testimonial_pool.invalidate()
         return jsonify({"success": True, "is_public": t.is_public})
     except Exception as e:
         return jsonify({"success": False, "message": str(e)}), 500
 
 
+@roles_required("admin")
+def admin_cache_stats(user):
+    """Hit/miss counters for every per-worker cache (this worker only)."""
+    from Utils.cache import all_cache_stats
+    return jsonify({"success": True, "pid": os.getpid(), "caches": all_cache_stats()})
+
+
+@roles_required("admin")
+def admin_purge_page_cache(user):
+    """Drop cached pages in every worker; body ``{"path": "/about"}`` purges one page."""
+    from flask import request
+    from Utils.page_cache import purge_pages
+    path = (request.get_json(silent=True) or {}).get("path")
+    return jsonify({"success": True, "pid": os.getpid(), "purged": purge_pages(path)})
+
+
 def admin_send_email():
     from flask import request
     from Utils.email import send_reset_email
@@ -10,6 +10,7 @@ from mongoengine import ValidationError
 from Models.userModel import User
 from Utils.appError import AppError
 from Utils.jwt_utils import create_access_token, create_refresh_token, decode_token
+from Utils.refresh_tokens import issue_refresh_token, rotate_refresh_token, revoke_family
 from Utils.auth_decorator import token_required, roles_required
 from werkzeug.security import generate_password_hash
 from Utils.email import send_reset_email
@@ -39,12 +40,8 @@ def register():
     if password != password_confirm:
         raise AppError("Passwords do not match.", 400)
 
-    if User.objects(email=email).first():
-        raise AppError("Email already registered.", 400)
-    if User.objects(phone=phone).first():
-        raise AppError("Phone number already registered.", 400)
-
     try:
+        # Duplicate email/phone/name are reported by User.save from the unique indexes
         # ✅ Create new user with default photo
         user = User(
             name=name,
@@ -66,6 +63,8 @@ def register():
 
     except ValidationError as e:
         raise AppError(str(e), 400)
+    except AppError:
+        raise
     except Exception as e:
         logger.exception("🔥 Unexpected error during registration.")
         raise AppError("Internal server error.", 500)
@@ -99,8 +98,8 @@ def login():
         raise AppError("Invalid password.", 401)
 
     role_value = getattr(user.role, "value", user.role)
-    access_token = create_access_token(user.id, role_value)
-    refresh_token = create_refresh_token({"user_id": str(user.id), "role": role_value})
+    refresh_token, family_id = issue_refresh_token(user.id, role_value)
+    access_token = create_access_token(user.id, role_value, family_id=family_id)
 
     logger.info(f"✅ Login successful for {identifier}")
 
@@ -130,26 +129,22 @@ def login():
 # =====================================================
 @auth_bp.route("/refresh", methods=["POST"])
 def refresh_token():
-    data = request.get_json() or {}
-    token = data.get("refresh_token")
+    data = request.get_json(silent=True) or {}
+    token = data.get("refresh_token") or request.cookies.get("refresh_token")
 
     if not token:
         raise AppError("Refresh token required.", 400)
 
-    decoded = decode_token(token)
-    if not decoded:
-        raise AppError("Invalid or expired refresh token.", 401)
-
-    user = User.objects(id=decoded.get("user_id")).first()
-    if not user:
-        raise AppError("User not found.", 404)
+    # Rotates the token; a reused (already rotated) token revokes its whole family
+    user, new_refresh_token, family_id = rotate_refresh_token(token)
 
-    new_access_token = create_access_token(user.id, user.role.value)
-    logger.info(f"🔁 Token refreshed for {user.email}")
+    new_access_token = create_access_token(user.id, user.role.value, family_id=family_id)
+    logger.info(f"🔁 Token refreshed for user {user.id}")
 
     resp = make_response(jsonify({
         "status": "success",
-        "access_token": new_access_token
+        "access_token": new_access_token,
+        "refresh_token": new_refresh_token
     }))
     cookie_kwargs = {
         "httponly": True,
@@ -157,6 +152,7 @@ def refresh_token():
         "secure": False
     }
     resp.set_cookie("access_token", new_access_token, **cookie_kwargs)
+    resp.set_cookie("refresh_token", new_refresh_token, **cookie_kwargs)
     return resp, 200
 
 
@@ -228,6 +224,8 @@ def reset_password():
         raise AppError("User not found.", 404)
 
     user.password = User.hash_password(new_password)
+    # Tokens issued before this moment are rejected by token_required
+    user.password_changed_at = datetime.utcnow() - timedelta(seconds=1)
     user.save()
 
     logger.info(f"🔐 Password reset successfully for {user.email}")
@@ -266,8 +264,26 @@ def admin_dashboard(user):
 # =====================================================
 @auth_bp.route("/logout", methods=["POST"])
 def logout():
-    logger.info("👋 User logged out (client-side).")
-    return jsonify({"status": "success", "message": "Logout successful."}), 200
+    data = request.get_json(silent=True) or {}
+    family_id = None
+    for token in (data.get("refresh_token"), request.cookies.get("refresh_token"),
+                  request.cookies.get("access_token")):
+        decoded = decode_token(token) if token else None
+        if decoded and decoded.get("fam"):
+            family_id = decoded["fam"]
+            break
+
+    # Revokes the refresh-token family and every access token carrying it
+    if family_id:
+        revoke_family(family_id)
+        logger.info(f"👋 User logged out; session family {family_id} revoked.")
+    else:
+        logger.info("👋 User logged out (client-side).")
+
+    resp = make_response(jsonify({"status": "success", "message": "Logout successful."}))
+    resp.delete_cookie("access_token")
+    resp.delete_cookie("refresh_token")
+    return resp, 200
 
 
 @auth_bp.errorhandler(AppError)
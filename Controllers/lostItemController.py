@@ -6,6 +6,10 @@ from Models.userModel import User
 from Models.claimedItemModel import ClaimedItem
 from Utils.appError import AppError
 from Utils.auth_decorator import token_required
+from Utils.profile_fragments import bump_content_version
+from Utils.hashid_utils import encode_object_id
+from Utils.similarity import find_similar_items
+from bson import ObjectId
 import json
 from urllib import request as urlrequest
 
@@ -131,6 +135,7 @@ def create_lost_item(user):
         )
         
         lost_item.save()
+        bump_content_version(user)
         
         logger.info(f"✅ Lost item created by {user.email}: {lost_item.id}")
         
@@ -180,6 +185,40 @@ def get_lost_item_by_id(user, item_id):
         logger.error(f"Error fetching lost item {item_id}: {str(e)}")
         raise AppError(f"Error fetching lost item: {str(e)}", 500)
 
+def get_similar_lost_items(item_id):
+    """Active items whose photos look like this item's (used by the item detail page)."""
+    try:
+        if not ObjectId.is_valid(item_id):
+            raise AppError("Lost item not found", 404)
+        item = LostItem.objects(id=item_id, is_active=True).only('id', 'images').first()
+        if not item:
+            raise AppError("Lost item not found", 404)
+
+        limit = max(1, min(int(request.args.get('limit', 8)), 24))
+        similar = find_similar_items(item, limit=limit)
+
+        return jsonify({
+            "success": True,
+            "data": [{
+                "id": str(other.id),
+                "slug": encode_object_id(str(other.id)),
+                "title": other.title,
+                "status": other.status,
+                "category": other.category,
+                "city_town": other.city_town,
+                "image": f"/uploads/{other.images[0]}" if other.images else None,
+                "distance": distance
+            } for distance, other in similar]
+        }), 200
+
+    except AppError as e:
+        raise e
+    except ValueError:
+        raise AppError("Invalid limit", 400)
+    except Exception as e:
+        logger.error(f"Error finding items similar to {item_id}: {str(e)}")
+        raise AppError(f"Error finding similar items: {str(e)}", 500)
+
 @token_required
 def update_lost_item(user, item_id):
     """Update a lost item report."""
@@ -217,6 +256,7 @@ def update_lost_item(user, item_id):
                 raise AppError("Invalid date format for date_lost", 400)
         
         item.save()
+        bump_content_version(user)
         
         logger.info(f"✅ Lost item updated by {user.email}: {item.id}")
         
@@ -242,6 +282,7 @@ def delete_lost_item(user, item_id):
         
         item.is_active = False
         item.save()
+        bump_content_version(user)
         
         logger.info(f"✅ Lost item deleted by {user.email}: {item.id}")
         
@@ -272,6 +313,7 @@ def claim_lost_item(user, item_id):
         claimed.save()
 
         item.delete()
+        bump_content_version(user)
 
         logger.info(f"✅ Item {item_id} moved to claimed_items")
         return jsonify({"success": True, "message": "Item marked as claimed"}), 200
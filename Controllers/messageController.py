@@ -1,10 +1,29 @@
-from flask import request, jsonify
+from flask import request, jsonify, Response
 from Utils.auth_decorator import token_required
 from Utils.appError import AppError
 from Models.messageModel import Message
 from Models.lostItemModel import LostItem
+from Models.userModel import User
+from Utils.pagination import page_size, encode_cursor, after_cursor
+from Utils.conversations import (
+    conversation_key, record_message, record_read, record_bulk_read, get_unread_count,
+    message_fingerprint, claim_fingerprint, release_fingerprint, display_names
+)
+from Models.conversationModel import Conversation
+from Utils.pubsub import event_stream, user_channel
+from Utils.profile_fragments import bump_content_version
+from bson import ObjectId
+from mongoengine.queryset.visitor import Q
 from Models.messageModel import Message as MessageModel
-from datetime import datetime, timedelta
+
+BULK_MAX_IDS = 500
+# action -> update applied to the selected messages (read state is handled separately)
+BULK_ACTIONS = {
+    "read": {},
+    "archive": {"set__archived": True},
+    "unarchive": {"set__archived": False},
+    "delete": {"set__deleted": True},
+}
 
 @token_required
 def create_message(user):
@@ -26,16 +45,8 @@ def create_message(user):
         raise AppError("Item owner not found", 404)
 
     # --- Anti-duplicate logic: Prevent duplicate messages within 30s ---
-    thirty_secs_ago = datetime.utcnow() - timedelta(seconds=30)
-    duplicate = Message.objects(
-        sender=user,
-        receiver=receiver,
-        item=item,
-        title=title,
-        body=body,
-        created_at__gte=thirty_secs_ago
-    ).first()
-    if duplicate:
+    fingerprint = message_fingerprint(user, receiver, item, title, body)
+    if not claim_fingerprint(fingerprint):
         raise AppError("Duplicate: You've already sent this message recently.", 429)
     # ---------------------------------------------------------------
 
@@ -46,41 +57,153 @@ def create_message(user):
         title=title,
         body=body,
         images=images,
-        read=False
+        read=False,
+        conversation_key=conversation_key(item, user, receiver)
     )
-    msg.save()
+    try:
+        msg.save()
+    except Exception:
+        release_fingerprint(fingerprint)
+        raise
+    record_message(msg)
 
     return jsonify({"success": True, "message": "Message sent"}), 201
 
 @token_required
 def get_inbox(user):
+    """Messages received by the user, newest first, one page at a time.
+
+    Query params: ``limit`` (default 20, max 100), ``cursor`` (``next_cursor``
+    of the previous page) and optional ``item_id``. Senders and items are
+    resolved with one ``$in`` query each instead of a lookup per message.
+    """
     item_id = request.args.get('item_id')
-    q = {'receiver': user}
+    limit = page_size(request.args.get('limit'))
+    cursor = request.args.get('cursor')
+
+    qs = Message.objects(receiver=user.id, deleted__ne=True)
+    # Archived messages are listed only when asked for (?archived=true)
+    if request.args.get('archived', '').lower() == 'true':
+        qs = qs.filter(archived=True)
+    else:
+        qs = qs.filter(archived__ne=True)
     if item_id:
-        q['item'] = item_id
-    msgs = Message.objects(**q).order_by('-created_at')
+        if not ObjectId.is_valid(item_id):
+            raise AppError("Invalid item id", 400)
+        qs = qs.filter(item=ObjectId(item_id))
+    if cursor:
+        qs = qs.filter(after_cursor(cursor))
+
+    rows = list(
+        qs.order_by('-created_at', '-id')
+        .only('id', 'sender', 'item', 'title', 'body', 'created_at', 'read')
+        .limit(limit + 1)
+        .as_pymongo()
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    sender_ids = {r['sender'] for r in rows if r.get('sender')}
+    item_ids = {r['item'] for r in rows if r.get('item')}
+    senders = display_names(sender_ids)
+    items = {
+        i['_id']: i.get('title')
+        for i in LostItem.objects(id__in=list(item_ids)).only('title').as_pymongo()
+    } if item_ids else {}
+
     data = []
-    for m in msgs:
+    for r in rows:
         data.append({
-            "id": str(m.id),
-            "sender_name": f"{getattr(m.sender, 'first_name', '')} {getattr(m.sender, 'last_name', '')}".strip() or getattr(m.sender, 'name', 'Unknown'),
-            "title": m.title,
-            "body": m.body,
-            "created_at": m.created_at.isoformat() if m.created_at else None,
-            "read": bool(m.read),
-            "item_id": str(m.item.id) if m.item else None
+            "id": str(r['_id']),
+            "sender_name": senders.get(r.get('sender'), 'Unknown'),
+            "title": r.get('title'),
+            "body": r.get('body'),
+            "created_at": r['created_at'].isoformat() if r.get('created_at') else None,
+            "read": bool(r.get('read')),
+            "item_id": str(r['item']) if r.get('item') else None,
+            "item_title": items.get(r.get('item'))
         })
-    return jsonify({"success": True, "data": data}), 200
+
+    next_cursor = None
+    if has_more and rows:
+        next_cursor = encode_cursor(rows[-1]['created_at'], rows[-1]['_id'])
+    return jsonify({"success": True, "data": data, "next_cursor": next_cursor}), 200
 
 @token_required
 def mark_read(user, message_id):
-    m = Message.objects(id=message_id, receiver=user).first()
-    if not m:
+    if not ObjectId.is_valid(message_id):
+        raise AppError("Message not found", 404)
+    # Only the unread -> read transition touches the counters
+    m = Message.objects(id=message_id, receiver=user.id, read=False).modify(set__read=True)
+    if m:
+        record_read(m)
+    elif not Message.objects(id=message_id, receiver=user.id).only('id').first():
         raise AppError("Message not found", 404)
-    m.read = True
-    m.save()
     return jsonify({"success": True}), 200
 
+@token_required
+def bulk_update_messages(user):
+    """Mark many received messages as read, archived, unarchived or deleted.
+
+    Body: ``action`` plus either ``ids`` (up to 500 message ids) or
+    ``conversation_id`` (every message of that thread received by the user).
+    Each step is one ``update_many`` scoped to the receiver; deleting also
+    marks the messages read so they stop counting as unread.
+    """
+    data = request.get_json() or {}
+    action = data.get('action')
+    ids = data.get('ids')
+    conversation_id = data.get('conversation_id')
+
+    if action not in BULK_ACTIONS:
+        raise AppError(f"action must be one of: {', '.join(BULK_ACTIONS)}", 400)
+    if bool(ids) == bool(conversation_id):
+        raise AppError("Provide either ids or conversation_id", 400)
+
+    qs = Message.objects(receiver=user.id)
+    if ids:
+        if not isinstance(ids, list) or len(ids) > BULK_MAX_IDS:
+            raise AppError(f"ids must be a list of at most {BULK_MAX_IDS} message ids", 400)
+        if not all(isinstance(i, str) and ObjectId.is_valid(i) for i in ids):
+            raise AppError("Invalid message id", 400)
+        qs = qs.filter(id__in=[ObjectId(i) for i in set(ids)])
+    else:
+        if not ObjectId.is_valid(conversation_id):
+            raise AppError("Conversation not found", 404)
+        convo = Conversation.objects(id=conversation_id, participants=user.id).only('key').first()
+        if not convo:
+            raise AppError("Conversation not found", 404)
+        qs = qs.filter(conversation_key=convo.key)
+
+    marked_read = 0
+    if action in ("read", "delete"):
+        unread = list(qs.filter(read=False).only('id', 'sender', 'conversation_key').as_pymongo())
+        if unread:
+            marked_read = qs.filter(id__in=[r['_id'] for r in unread], read=False).update(set__read=True)
+            record_bulk_read(user.id, unread, marked_read)
+
+    modified = marked_read
+    if BULK_ACTIONS[action]:
+        modified = qs.update(**BULK_ACTIONS[action])
+        if modified:
+            bump_content_version(user.id)
+
+    return jsonify({"success": True, "action": action, "modified": modified,
+                    "marked_read": marked_read}), 200
+
+@token_required
+def stream_message_events(user):
+    """Server-Sent Events: ``message`` and ``read`` events for the signed-in user."""
+    resp = Response(event_stream(user_channel(user.id)), mimetype="text/event-stream")
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.headers["X-Accel-Buffering"] = "no"  # don't let nginx buffer the stream
+    return resp
+
+@token_required
+def get_unread_messages_count(user):
+    """Unread message count for the header badge (no inbox scan)."""
+    return jsonify({"success": True, "unread": get_unread_count(user.id)}), 200
+
 @token_required
 def reply_message(user):
     data = request.get_json() or {}
@@ -99,8 +222,95 @@ def reply_message(user):
         item=orig.item,
         title=title,
         body=body,
-        read=False
+        read=False,
+        conversation_key=conversation_key(orig.item, user, orig.sender)
     )
     msg.save()
+    record_message(msg)
     return jsonify({"success": True}), 201
 
+
+@token_required
+def get_conversations(user):
+    """The user's threads, most recent activity first (one indexed query per page)."""
+    limit = page_size(request.args.get('limit'))
+    cursor = request.args.get('cursor')
+
+    qs = Conversation.objects(participants=user.id)
+    if cursor:
+        qs = qs.filter(after_cursor(cursor, field='last_message_at'))
+    rows = list(qs.order_by('-last_message_at', '-id').limit(limit + 1).as_pymongo())
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    me = ObjectId(str(user.id))
+    other_ids = {p for r in rows for p in r.get('participants', []) if p != me}
+    item_ids = {r['item'] for r in rows if r.get('item')}
+    names = display_names(other_ids)
+    titles = {
+        i['_id']: i.get('title')
+        for i in LostItem.objects(id__in=list(item_ids)).only('title').as_pymongo()
+    } if item_ids else {}
+
+    data = []
+    for r in rows:
+        other = next((p for p in r.get('participants', []) if p != me), me)
+        data.append({
+            "id": str(r['_id']),
+            "item_id": str(r['item']) if r.get('item') else None,
+            "item_title": titles.get(r.get('item')),
+            "with_user_id": str(other),
+            "with_user_name": names.get(other, 'Unknown'),
+            "last_snippet": r.get('last_snippet'),
+            "last_message_at": r['last_message_at'].isoformat() if r.get('last_message_at') else None,
+            "last_from_me": r.get('last_sender') == me,
+            "message_count": r.get('message_count', 0),
+            "unread": (r.get('unread') or {}).get(str(me), 0)
+        })
+
+    next_cursor = None
+    if has_more and rows:
+        next_cursor = encode_cursor(rows[-1]['last_message_at'], rows[-1]['_id'])
+    return jsonify({"success": True, "data": data, "next_cursor": next_cursor}), 200
+
+
+@token_required
+def get_conversation_messages(user, conversation_id):
+    """Messages of one thread, newest first, paginated like the inbox."""
+    if not ObjectId.is_valid(conversation_id):
+        raise AppError("Conversation not found", 404)
+    convo = Conversation.objects(id=conversation_id, participants=user.id).only('key').first()
+    if not convo:
+        raise AppError("Conversation not found", 404)
+
+    limit = page_size(request.args.get('limit'))
+    cursor = request.args.get('cursor')
+    me = ObjectId(str(user.id))
+    # Messages the user deleted stay visible to the other participant only
+    qs = Message.objects(Q(deleted__ne=True) | Q(receiver__ne=me), conversation_key=convo.key)
+    if cursor:
+        qs = qs.filter(after_cursor(cursor))
+    rows = list(
+        qs.order_by('-created_at', '-id')
+        .only('id', 'sender', 'title', 'body', 'images', 'created_at', 'read')
+        .limit(limit + 1)
+        .as_pymongo()
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    data = [{
+        "id": str(r['_id']),
+        "from_me": r.get('sender') == me,
+        "title": r.get('title'),
+        "body": r.get('body'),
+        "images": r.get('images', []),
+        "created_at": r['created_at'].isoformat() if r.get('created_at') else None,
+        "read": bool(r.get('read'))
+    } for r in rows]
+
+    next_cursor = None
+    if has_more and rows:
+        next_cursor = encode_cursor(rows[-1]['created_at'], rows[-1]['_id'])
+    return jsonify({"success": True, "data": data, "next_cursor": next_cursor}), 200
+
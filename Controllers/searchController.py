@@ -4,6 +4,7 @@ from Utils.appError import AppError
 from Models.lostItemModel import LostItem
 from Models.userModel import User
 from Utils.jwt_utils import decode_token
+from Utils.revocation import revocations
 from Utils.hashid_utils import encode_object_id
 from mongoengine import Q
 import math
@@ -24,6 +25,8 @@ def require_auth(f):
             decoded = decode_token(token)
             if not decoded or 'user_id' not in decoded:
                 raise AppError("Invalid token", 401)
+            if decoded.get('type') == 'refresh' or revocations.is_revoked(decoded.get('fam')):
+                raise AppError("Invalid token", 401)
             user_id = decoded['user_id']
             return f(user_id, *args, **kwargs)
         except Exception as e:
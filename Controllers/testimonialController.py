@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify
 from Utils.appError import AppError
 from Utils.auth_decorator import token_required
 from Models.testimonialModel import Testimonial
+from Utils.testimonial_pool import testimonial_pool
 
 
 testimonial_bp = Blueprint('testimonial', __name__, url_prefix='/api/testimonials')
@@ -28,6 +29,7 @@ def create_testimonial(user):
     else:
         t = Testimonial(user=user, message=message)
         t.save()
+    testimonial_pool.invalidate()
     return jsonify({
         'success': True,
         'testimonial': {
@@ -48,28 +50,12 @@ def list_testimonials():
         limit = 10
     random = request.args.get('random', 'false').lower() in ('1', 'true', 'yes')
 
-    items = []
+    # Served from the per-worker pool (public only, author denormalized)
     if random:
-        samples = list(Testimonial.objects.aggregate({"$sample": {"size": limit}}))
-        for doc in samples:
-            t = Testimonial.objects(id=doc.get('_id')).first()
-            if not t or not t.is_public:
-                continue
-            items.append({
-                'id': str(t.id),
-                'message': t.message,
-                'user_name': getattr(t.user, 'name', 'Anonymous'),
-                'user_photo': getattr(t.user, 'photo', 'default.jpg')
-            })
+        entries = testimonial_pool.sample(limit)
     else:
-        qs = Testimonial.objects(is_public=True).order_by('-created_at').limit(limit)
-        for t in qs:
-            items.append({
-                'id': str(t.id),
-                'message': t.message,
-                'user_name': getattr(t.user, 'name', 'Anonymous'),
-                'user_photo': getattr(t.user, 'photo', 'default.jpg')
-            })
+        entries = testimonial_pool.latest(limit)
+    items = [{k: e[k] for k in ('id', 'message', 'user_name', 'user_photo')} for e in entries]
 
     return jsonify({'success': True, 'items': items}), 200
 
@@ -2,18 +2,42 @@ import logging
 import os
 
 from flask import request, jsonify, send_file
-import io
-import uuid
-from PIL import Image
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 
 from Models.allImgsModel import AllImgs
 from Controllers.viewController import view_bp
 from Models.allImgsModel import AllImgs
 from Utils.appError import AppError
 from Utils.auth_decorator import token_required
+from Utils.image_variants import serve_upload, delete_variants
+from Utils.image_cache import invalidate_image
+from Utils.image_processing import process_upload
+from Utils.image_store import store_image
+from Utils.testimonial_pool import testimonial_pool
 
 logger = logging.getLogger(__name__)
 
+SUPPORTED_UPLOAD_TYPES = {"image/png": "png", "image/jpeg": "jpg"}
+BATCH_UPLOAD_MAX_FILES = int(os.getenv("BATCH_UPLOAD_MAX_FILES", 10))
+BATCH_UPLOAD_CONCURRENCY = int(os.getenv("BATCH_UPLOAD_CONCURRENCY", 4))
+
+
+def _save_upload(data, mime_type):
+    """Process and store one uploaded image. Returns (AllImgs doc, created)."""
+    if mime_type not in SUPPORTED_UPLOAD_TYPES:
+        raise AppError("Only PNG and JPEG formats are supported", 400)
+
+    # ✅ Orient, fit within 800x800 and strip metadata off the request thread
+    processed = process_upload(data, mime_type)
+
+    # ✅ Save into MongoDB GridFS under the content hash (duplicates share one file)
+    img_doc, created = store_image(processed.data, mime_type, SUPPORTED_UPLOAD_TYPES[mime_type],
+                                   hashes=(processed.dhash, processed.phash))
+    logger.info(f"✅ Uploaded image: {img_doc.filename}" + ("" if created else " (duplicate)"))
+    return img_doc, created
+
+
 def upload_image_to_all_imgs():
     try:
         # ✅ Accept both 'image' and 'file' keys
@@ -24,44 +48,16 @@ def upload_image_to_all_imgs():
         else:
             raise AppError("No image file provided", 400)
 
-        mime_type = image_file.mimetype
-        if mime_type not in ["image/png", "image/jpeg"]:
-            raise AppError("Only PNG and JPEG formats are supported", 400)
-
-        image = Image.open(image_file)
-        file_extension = "png" if mime_type == "image/png" else "jpg"
-
-        # ✅ Keep original filename, normalize extension
-        original_name = os.path.splitext(image_file.filename)[0]
-        filename = f"{original_name}.{file_extension}"
-
-        # ✅ If filename already exists in DB, append a unique suffix
-        existing = AllImgs.objects(filename=filename).first()
-        if existing:
-            unique_suffix = uuid.uuid4().hex[:8]
-            filename = f"{original_name}_{unique_suffix}.{file_extension}"
+        img_doc, created = _save_upload(image_file.read(), image_file.mimetype)
 
-        image = image.convert("RGB")
-        image = image.resize((800, 800))
-
-        img_byte_arr = io.BytesIO()
-        image.save(img_byte_arr, format="JPEG" if file_extension == "jpg" else "PNG")
-        img_byte_arr.seek(0)
-
-        # ✅ Save into MongoDB GridFS
-        img_doc = AllImgs(filename=filename, content_type=mime_type)
-        img_doc.file.put(img_byte_arr, content_type=mime_type)
-        img_doc.save()
-
-        logger.info(f"✅ Uploaded image: {filename}")
         return jsonify({
             "status": "success",
-            "message": "Image uploaded successfully",
+            "message": "Image uploaded successfully" if created else "Image already uploaded",
             "data": {
-                "filename": filename,
+                "filename": img_doc.filename,
                 "id": str(img_doc.id)
             }
-        }), 201
+        }), 201 if created else 200
 
     except AppError as e:
         raise e
@@ -70,19 +66,60 @@ def upload_image_to_all_imgs():
         raise AppError(f"Error uploading image: {str(e)}", 500)
 
 
+def upload_images_to_all_imgs():
+    """Upload several images in one request.
+
+    Files are processed and stored concurrently (at most
+    BATCH_UPLOAD_CONCURRENCY at a time per request). Responds 201 when every
+    file was stored, 207 with per-file errors when only some were, and 400
+    when none were.
+    """
+    image_files = (request.files.getlist("images") or request.files.getlist("image")
+                   or request.files.getlist("file"))
+    if not image_files:
+        raise AppError("No image files provided", 400)
+    if len(image_files) > BATCH_UPLOAD_MAX_FILES:
+        raise AppError(f"At most {BATCH_UPLOAD_MAX_FILES} images can be uploaded at once", 400)
+
+    # Read in the request thread; workers only see bytes
+    uploads = [(f.filename, f.mimetype, f.read()) for f in image_files]
+
+    def save(upload):
+        name, mime_type, data = upload
+        try:
+            img_doc, created = _save_upload(data, mime_type)
+            return {"original_name": name, "filename": img_doc.filename,
+                    "id": str(img_doc.id), "duplicate": not created}
+        except AppError as e:
+            return {"original_name": name, "message": str(e), "status_code": e.status_code}
+        except Exception as e:
+            logger.error(f"Error uploading image {name}: {str(e)}")
+            return {"original_name": name, "message": "Error uploading image", "status_code": 500}
+
+    with ThreadPoolExecutor(max_workers=min(BATCH_UPLOAD_CONCURRENCY, len(uploads))) as pool:
+        results = list(pool.map(save, uploads))
+
+    files, errors = [], []
+    for index, result in enumerate(results):
+        result["index"] = index
+        (errors if "message" in result else files).append(result)
+
+    if not errors:
+        status, code = "success", 201
+    elif files:
+        status, code = "partial", 207
+    else:
+        status, code = "fail", 400
+    return jsonify({
+        "status": status,
+        "message": f"{len(files)} of {len(uploads)} images uploaded",
+        "data": {"files": files, "errors": errors}
+    }), code
+
+
 def get_image_from_all_imgs(filename):
     try:
-        img_doc = AllImgs.objects(filename=filename).first()
-        if not img_doc:
-            raise AppError("Image not found", 404)
-
-        img_data = img_doc.file.read()
-        return send_file(
-            io.BytesIO(img_data),
-            mimetype=img_doc.content_type,
-            as_attachment=False,
-            download_name=filename
-        )
+        return serve_upload(filename)
     except AppError as e:
         raise e
     except Exception as e:
@@ -107,7 +144,10 @@ def upload_default_image_to_all_imgs():
             if existing:
                 logger.info("♻️ Replacing existing default.jpg in all_imgs")
                 existing.file.replace(f, content_type="image/jpeg")
+                existing.uploaded_at = datetime.utcnow()  # new Last-Modified for HTTP caches
                 existing.save()
+                invalidate_image("default.jpg")
+                delete_variants("default.jpg")
             else:
                 img_doc = AllImgs(filename="default.jpg", content_type="image/jpeg")
                 img_doc.file.put(f, content_type="image/jpeg")
@@ -129,15 +169,7 @@ def upload_default_image_to_all_imgs():
 
 @view_bp.route("/uploads/<filename>")
 def get_image(filename):
-    img = AllImgs.objects(filename=filename).first()
-    if not img:
-        raise AppError("Image not found", 404)
-
-    gridout = img.file.get()
-    return send_file(
-        io.BytesIO(gridout.read()),
-        mimetype=img.content_type or "image/jpeg"
-    )
+    return serve_upload(filename)
 
 @token_required
 def get_me(current_user):
@@ -158,6 +190,7 @@ def get_me(current_user):
 def update_profile(current_user):
     try:
         data = request.get_json() or {}
+        current_user = current_user.fetch()  # full document needed for save()
         
         # Update allowed fields
         if 'first_name' in data:
@@ -180,10 +213,13 @@ def update_profile(current_user):
             current_user.country = data['country']
         if 'display_phone' in data:
             current_user.display_phone = bool(data['display_phone'])
+        previous_photo = current_user.photo
         if 'photo' in data:
             current_user.photo = data['photo'] or "default.jpg"
         
         current_user.save()
+        if current_user.photo != previous_photo:
+            testimonial_pool.invalidate()  # testimonials show the author's photo
         
         return jsonify({
             "success": True,
@@ -197,6 +233,7 @@ def update_profile(current_user):
 @token_required
 def deactivate_account(current_user):
     try:
+        current_user = current_user.fetch()
         current_user.active = False
         current_user.save()
         
@@ -3,10 +3,12 @@ from flask import render_template, Blueprint, request
 from Models.userModel import User
 from Utils.appError import AppError
 from Models.lostItemModel import LostItem
-from Models.messageModel import Message
-from Utils.hashid_utils import decode_slug, encode_object_id
+from Utils.hashid_utils import decode_slug
 from Utils.auth_decorator import token_required
-from Models.testimonialModel import Testimonial
+from Utils.testimonial_pool import testimonial_pool
+from Utils.profile_fragments import render_listings, render_inbox
+from Utils.page_cache import cached_page, micro_cached_page
+from bson import ObjectId
 
 logger = logging.getLogger(__name__)
 
@@ -14,15 +16,18 @@ logger = logging.getLogger(__name__)
 view_bp = Blueprint("view", __name__)
 
 @view_bp.route("/")
+@cached_page
 def home():
     logger.info("Rendering home page")
     return render_template("index.html")
 
 @view_bp.route("/about")
+@cached_page
 def about():
     return render_template("about.html")
 
 @view_bp.route("/blog")
+@cached_page
 def blog():
     return render_template("blog.html")
 
@@ -34,23 +39,8 @@ def testimonial():
     except Exception:
         limit = 4
 
-    # Use aggregation $sample for randomness
-    samples = list(Testimonial.objects.aggregate({"$sample": {"size": limit}}))
-
-    # Enrich with user fields needed by template
-    testimonials = []
-    for doc in samples:
-        # doc is a raw dict from aggregation; fetch full document for dereferencing user
-        t = Testimonial.objects(id=doc.get('_id')).first()
-        if not t or not t.is_public:
-            continue
-        testimonials.append({
-            "id": str(t.id),
-            "message": t.message,
-            "user_name": getattr(t.user, 'name', 'Anonymous'),
-            "user_photo": getattr(t.user, 'photo', 'default.jpg'),
-            "created_at": t.created_at
-        })
+    # Drawn from the per-worker pool: no query per visit
+    testimonials = testimonial_pool.sample(limit)
 
     return render_template("testimonial.html", testimonials=testimonials)
 
@@ -66,21 +56,15 @@ def profile(user, slug):
     if str(user.id) != str(target_user.id) and user.role != "admin":
         raise AppError("Unauthorized access.", 403)
 
-    # Fetch user's lost items
-    from Models.lostItemModel import LostItem
-    lost_items = LostItem.objects(reported_by=target_user, is_active=True).order_by('-created_at')
-    
-    # Convert ObjectIds to strings for template rendering
-    for item in lost_items:
-        item.id_str = str(item.id)
-        try:
-            item.slug = encode_object_id(item.id)
-        except Exception:
-            item.slug = item.id_str
-    
-    # Fetch inbox messages
-    inbox = Message.objects(receiver=target_user).order_by('-created_at')
-    return render_template("profile.html", user=target_user, lost_items=lost_items, inbox=inbox)
+    inbox_item = request.args.get('inbox_item') or None
+    if inbox_item and not ObjectId.is_valid(inbox_item):
+        raise AppError("Invalid item id", 400)
+
+    # Paginated tab fragments, cached per user until their content_version changes
+    listings_html = render_listings(target_user, request.args.get('items_cursor') or None)
+    inbox_html = render_inbox(target_user, request.args.get('inbox_cursor') or None, inbox_item)
+    return render_template("profile.html", user=target_user,
+                           listings_html=listings_html, inbox_html=inbox_html)
 
 # ✅ Edit Profile route
 @view_bp.route("/profile/edit")
@@ -95,15 +79,18 @@ def report_lost_item(user):
     return render_template("report_lost_item.html", user=user)
 
 @view_bp.route("/shop")
+@cached_page
 def shop():
     return render_template("shop.html")
 
 @view_bp.route('/results', methods=['GET'])
+@cached_page
 def search_results():
     return render_template('results.html')
 
 # ✅ Item detail route by slug
 @view_bp.route('/item/<slug>')
+@micro_cached_page
 def item_detail(slug: str):
     object_id_hex = decode_slug(slug)
     if not object_id_hex:
@@ -1,10 +1,26 @@
-from mongoengine import Document, StringField, FileField, DateTimeField
+from mongoengine import Document, StringField, FileField, DateTimeField, IntField, LongField
 from datetime import datetime
 
 class AllImgs(Document):
     filename = StringField(required=True, unique=True)
-    file = FileField(required=True)  # Stored in GridFS
+    file = FileField()  # GridFS copy, when storage == "gridfs"
+    # Where the bytes live: gridfs | filesystem | s3 (see Utils/image_store.py)
+    storage = StringField(default="gridfs")
+    storage_key = StringField()  # path/object key for filesystem and s3
+    length = IntField()
     content_type = StringField(default="image/jpeg")
     uploaded_at = DateTimeField(default=datetime.utcnow)
+    # Uploads are named by content hash; identical uploads share one file.
+    # Last time a duplicate upload returned this file (the orphan GC spares recent ones)
+    last_used_at = DateTimeField()
+    # 64-bit perceptual hashes (stored signed) for visual similarity, see Utils/similarity.py
+    dhash = LongField()
+    phash = LongField()
+    # Resized/re-encoded renditions point back at their source image
+    variant_of = StringField()
+    variant = StringField()  # e.g. "w200.webp"
 
-    meta = {'collection': 'all_imgs'}
+    meta = {
+        'collection': 'all_imgs',
+        'indexes': ['variant_of', 'uploaded_at']
+    }
@@ -0,0 +1,24 @@
+from mongoengine import Document, StringField, ReferenceField, DateTimeField, ListField, IntField, DictField, ObjectIdField
+from datetime import datetime
+
+
+class Conversation(Document):
+    """One thread per (item, participant pair), maintained as messages are sent/read."""
+    key = StringField(required=True, unique=True)  # "<item_id>:<lower user_id>:<higher user_id>"
+    item = ReferenceField('LostItem', required=True)
+    participants = ListField(ReferenceField('User'))
+    last_message = ObjectIdField()
+    last_sender = ReferenceField('User')
+    last_snippet = StringField(max_length=200)
+    last_message_at = DateTimeField()
+    message_count = IntField(default=0)
+    unread = DictField()  # str(user_id) -> unread messages for that participant
+    created_at = DateTimeField(default=datetime.utcnow)
+
+    meta = {
+        'collection': 'conversations',
+        'indexes': [
+            # Thread list: newest activity first for one participant
+            ('participants', '-last_message_at', '-id')
+        ]
+    }
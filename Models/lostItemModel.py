@@ -128,7 +128,10 @@ class LostItem(Document):
             'state_province',
             'city_town',
             'reported_by',
-            'created_at'
+            'created_at',
+            'images',
+            # Profile listings keyset pagination
+            ('reported_by', '-created_at', '-id')
         ]
     }
     
@@ -0,0 +1,16 @@
+from mongoengine import Document, StringField, DateTimeField
+from datetime import datetime
+
+
+class MessageFingerprint(Document):
+    # sha256 of sender/receiver/item/title/body; one per duplicate window
+    fingerprint = StringField(required=True, unique=True)
+    created_at = DateTimeField(default=datetime.utcnow)
+
+    meta = {
+        'collection': 'message_fingerprints',
+        'indexes': [
+            # Mongo's TTL monitor runs about once a minute, so expiry is also checked on claim
+            {'fields': ['created_at'], 'expireAfterSeconds': 30}
+        ]
+    }
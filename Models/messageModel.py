@@ -9,10 +9,20 @@ class Message(Document):
     body = StringField(required=True, max_length=3000)
     images = ListField(StringField())
     read = BooleanField(default=False)
+    # Receiver-side flags: hidden from the receiver's inbox, kept for the sender
+    archived = BooleanField(default=False)
+    deleted = BooleanField(default=False)
+    conversation_key = StringField()  # see Models/conversationModel.py
     created_at = DateTimeField(default=datetime.utcnow)
 
     meta = {
         'collection': 'messages',
-        'indexes': ['receiver', 'sender', 'created_at']
+        'indexes': [
+            'receiver', 'sender', 'created_at',
+            # Inbox keyset pagination: newest first, _id breaks ties
+            ('receiver', '-created_at', '-id'),
+            ('receiver', 'item', '-created_at', '-id'),
+            ('conversation_key', '-created_at', '-id')
+        ]
     }
 
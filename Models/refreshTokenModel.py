@@ -0,0 +1,23 @@
+from mongoengine import Document, StringField, ReferenceField, DateTimeField, BooleanField
+from datetime import datetime
+
+
+class RefreshToken(Document):
+    # One document per issued refresh token; tokens from one login share a family_id
+    jti = StringField(required=True, unique=True)
+    family_id = StringField(required=True)
+    user = ReferenceField('User', required=True)
+    used = BooleanField(default=False)        # set when rotated
+    revoked = BooleanField(default=False)     # set on logout or reuse detection
+    replaced_by = StringField()
+    created_at = DateTimeField(default=datetime.utcnow)
+    expires_at = DateTimeField(required=True)
+
+    meta = {
+        'collection': 'refresh_tokens',
+        'indexes': [
+            'family_id',
+            ('revoked', 'expires_at'),
+            {'fields': ['expires_at'], 'expireAfterSeconds': 0}
+        ]
+    }
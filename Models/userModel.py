@@ -1,8 +1,8 @@
 from mongoengine import (
     Document, EmailField, StringField, BooleanField,
-    DateTimeField, EnumField,IntField, ValidationError
+    DateTimeField, EnumField,IntField, ValidationError, NotUniqueError
 )
-from bcrypt import hashpw, gensalt, checkpw
+from bson import ObjectId
 import hashlib
 import secrets
 from datetime import datetime, timedelta
@@ -10,6 +10,9 @@ from enum import Enum
 from hashids import Hashids
 import os
 
+from Utils import passwords
+from Utils.user_cache import invalidate_principal, PRINCIPAL_FIELDS
+
 # =====================================
 #  HASHIDS CONFIGURATION
 # =====================================
@@ -25,6 +28,14 @@ hashids = Hashids(
     alphabet=HASHIDS_ALPHABET
 )
 
+# Unique index (field name) -> user-facing duplicate message
+DUPLICATE_KEY_MESSAGES = {
+    'email': "Email already registered.",
+    'phone': "Phone number already registered.",
+    'name': "Username already taken.",
+    'profile_slug': "Could not create profile link, please try again.",
+}
+
 
 # =====================================
 #  ROLE ENUM
@@ -69,6 +80,10 @@ class User(Document):
     # Reputation status
     email_verified = BooleanField(default=False)
     phone_verified = BooleanField(default=False)
+    # Denormalized count of unread received messages (see Utils/conversations.py)
+    unread_messages = IntField(default=0)
+    # Bumped on item/message writes; keys the cached profile fragments (see Utils/profile_fragments.py)
+    content_version = IntField(default=0)
 
     meta = {
         'collection': 'users',
@@ -79,18 +94,24 @@ class User(Document):
     #  HELPERS
     # =====================================
     def generate_profile_slug(self):
-        """Generate unique short slug based on ObjectId timestamp."""
+        """Generate unique short slug based on ObjectId timestamp.
+
+        Collisions are left to the unique index on ``profile_slug``.
+        """
         if not self.id:
             raise ValidationError("Cannot generate profile slug before ObjectId is assigned")
 
         unique_int = int(self.id.generation_time.timestamp() * 1000) + int(str(self.id)[18:], 16)
-        slug = hashids.encode(unique_int)
+        return hashids.encode(unique_int)
 
-        # Ensure no collision
-        existing_user = User.objects(profile_slug=slug).first()
-        if existing_user and str(existing_user.id) != str(self.id):
-            raise ValidationError(f"HashID collision for slug {slug}")
-        return slug
+    @staticmethod
+    def duplicate_key_message(error: NotUniqueError) -> str:
+        """Map a duplicate-key error from the unique indexes to a readable message."""
+        text = str(error)
+        for field, message in DUPLICATE_KEY_MESSAGES.items():
+            if f"index: {field}_" in text:
+                return message
+        return "User already exists."
 
     def clean(self):
         """Validate and normalize user input before saving."""
@@ -126,50 +147,67 @@ class User(Document):
                 raise ValidationError("Phone number length invalid (must be 8–15 digits).")
 
             self.phone = int(cleaned)
-
-            # Check for duplicates (other users with same phone)
-            existing_user = User.objects(phone=self.phone, id__ne=self.id).first()
-            if existing_user:
-                raise ValidationError("Phone number already in use.")
+            # Duplicates are rejected by the unique index on phone (see save)
 
     # =====================================
     #  SAVE OVERRIDE
     # =====================================
     def save(self, *args, **kwargs):
-        """Custom save method to handle password hashing and slug creation."""
+        """Custom save method to handle password hashing and slug creation.
+
+        New users are written with a single insert: the ObjectId and slug are
+        assigned client-side and uniqueness is enforced by the indexes.
+        """
         # Step 1: Validate input fields
         self.clean()
 
         # Step 2: Hash password if not already hashed
         if self.password and not self.password.startswith("$2b$"):
-            self.password = hashpw(self.password.encode('utf-8'), gensalt(12)).decode('utf-8')
+            self.password = passwords.hash_password(self.password)
             self.password_changed_at = datetime.utcnow() - timedelta(seconds=1)
 
-        # Step 3: Save once to get ObjectId
-        if not self.id:
-            super(User, self).save(*args, **kwargs)
+        # Step 3: Pre-assign ObjectId so the slug can be computed before inserting
+        creating = not self.id
+        changed = set() if creating else set(self._get_changed_fields())
+        if creating:
+            self.id = ObjectId()
+            kwargs.setdefault('force_insert', True)
 
         # Step 4: Generate slug (requires ObjectId)
         if not self.profile_slug:
             self.profile_slug = self.generate_profile_slug()
 
-        # Optional debug output (remove later if needed)
-        print(f"💾 Saving user to MongoDB: {self.email}")
-
-        # Step 5: Final save
-        return super(User, self).save(*args, **kwargs)
+        # Step 5: Single write; map unique-index violations to validation errors
+        try:
+            result = super(User, self).save(*args, **kwargs)
+        except NotUniqueError as e:
+            if creating:
+                self.id = None
+                self.profile_slug = None
+            raise ValidationError(self.duplicate_key_message(e))
+
+        # Step 6: Drop the cached auth principal; all workers when role/active/password changed
+        invalidate_principal(self.id, everywhere=bool(changed & PRINCIPAL_FIELDS))
+        return result
+
+    def delete(self, *args, **kwargs):
+        """Delete the user and drop its cached auth principal."""
+        user_id = self.id
+        result = super(User, self).delete(*args, **kwargs)
+        invalidate_principal(user_id)
+        return result
 
     # =====================================
     #  PASSWORD + SECURITY HELPERS
     # =====================================
     def correct_password(self, candidate_password: str) -> bool:
         """Check if provided password matches the stored hash."""
-        return checkpw(candidate_password.encode('utf-8'), self.password.encode('utf-8'))
+        return passwords.check_password(candidate_password, self.password)
 
     @staticmethod
     def hash_password(password: str) -> str:
         """Hash a password using bcrypt."""
-        return hashpw(password.encode('utf-8'), gensalt(12)).decode('utf-8')
+        return passwords.hash_password(password)
 
     def create_password_reset_token(self) -> str:
         """Generate a secure password reset token."""
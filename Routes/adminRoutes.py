@@ -5,7 +5,7 @@ from Controllers.adminController import (
     admin_users_api, admin_user_delete, admin_user_toggle_active,
     admin_items_api, admin_item_delete, admin_item_toggle_active,
     admin_testimonials_api, admin_testimonial_delete, admin_testimonial_toggle_public,
-    admin_send_email,
+    admin_send_email, admin_cache_stats, admin_purge_page_cache,
     sales_log_page, get_sales_logs_text
 )
 from Controllers.salesController import create_sale, create_stripe_checkout, paypal_create_order, paypal_return, stripe_success, stripe_webhook, receipt_view
@@ -42,3 +42,5 @@ admin_routes.add_url_rule('/admin/api/testimonials', view_func=admin_testimonial
 admin_routes.add_url_rule('/admin/api/testimonials/<tid>', view_func=admin_testimonial_delete, methods=['DELETE'])
 admin_routes.add_url_rule('/admin/api/testimonials/<tid>/toggle', view_func=admin_testimonial_toggle_public, methods=['POST'])
 admin_routes.add_url_rule('/admin/api/send-email', view_func=admin_send_email, methods=['POST'])
+admin_routes.add_url_rule('/admin/api/cache-stats', view_func=admin_cache_stats, methods=['GET'])
+admin_routes.add_url_rule('/admin/api/page-cache/purge', view_func=admin_purge_page_cache, methods=['POST'])
@@ -1,7 +1,7 @@
 from flask import Blueprint
 from Controllers.lostItemController import (
     create_lost_item, get_user_lost_items, get_lost_item_by_id, 
-    update_lost_item, delete_lost_item, claim_lost_item
+    update_lost_item, delete_lost_item, claim_lost_item, get_similar_lost_items
 )
 
 # ----------------------------
@@ -15,4 +15,5 @@ lost_item_routes.add_url_rule('', view_func=get_user_lost_items, methods=['GET']
 lost_item_routes.add_url_rule('/<item_id>', view_func=get_lost_item_by_id, methods=['GET'])
 lost_item_routes.add_url_rule('/<item_id>', view_func=update_lost_item, methods=['PUT'])
 lost_item_routes.add_url_rule('/<item_id>', view_func=delete_lost_item, methods=['DELETE'])
+lost_item_routes.add_url_rule('/<item_id>/similar', view_func=get_similar_lost_items, methods=['GET'])
 lost_item_routes.add_url_rule('/<item_id>/claim', view_func=claim_lost_item, methods=['POST'])
@@ -1,11 +1,18 @@
 from flask import Blueprint
-from Controllers.messageController import create_message, get_inbox, mark_read, reply_message
+from Controllers.messageController import (
+    create_message, get_inbox, mark_read, reply_message,
+    get_conversations, get_conversation_messages, get_unread_messages_count,
+    stream_message_events, bulk_update_messages
+)
 
 message_routes = Blueprint('message_routes', __name__, url_prefix='/api/v1')
 
 message_routes.add_url_rule('/messages', view_func=create_message, methods=['POST'])
 message_routes.add_url_rule('/messages/inbox', view_func=get_inbox, methods=['GET'])
+message_routes.add_url_rule('/messages/stream', view_func=stream_message_events, methods=['GET'])
+message_routes.add_url_rule('/messages/unread-count', view_func=get_unread_messages_count, methods=['GET'])
+message_routes.add_url_rule('/messages/bulk', view_func=bulk_update_messages, methods=['PATCH'])
 message_routes.add_url_rule('/messages/<message_id>/read', view_func=mark_read, methods=['PATCH'])
 message_routes.add_url_rule('/messages/reply', view_func=reply_message, methods=['POST'])
-
-
+message_routes.add_url_rule('/conversations', view_func=get_conversations, methods=['GET'])
+message_routes.add_url_rule('/conversations/<conversation_id>/messages', view_func=get_conversation_messages, methods=['GET'])
@@ -1,7 +1,7 @@
 from flask import Blueprint
 from Controllers.authController import login, register, logout
 from Controllers.userController import (
-    upload_image_to_all_imgs,
+    upload_image_to_all_imgs, upload_images_to_all_imgs,
     upload_default_image_to_all_imgs,
     get_image_from_all_imgs, get_me, update_profile, deactivate_account
 )
@@ -23,6 +23,7 @@ auth_routes.add_url_rule('/logout', view_func=logout, methods=['POST'])
 # User (AllImgs) routes
 # ----------------------------
 user_routes.add_url_rule('/upload-image-to-allimgs', view_func=upload_image_to_all_imgs, methods=['POST'])
+user_routes.add_url_rule('/upload-images-to-allimgs', view_func=upload_images_to_all_imgs, methods=['POST'])
 user_routes.add_url_rule('/upload-default-to-allimgs', view_func=upload_default_image_to_all_imgs, methods=['POST'])
 user_routes.add_url_rule('/me', view_func=get_me, methods=['GET'])
 user_routes.add_url_rule('/profile', view_func=update_profile, methods=['PUT'])
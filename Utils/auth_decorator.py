@@ -2,7 +2,8 @@
 from functools import wraps
 from flask import request, jsonify, render_template, redirect
 from Utils.jwt_utils import decode_token
-from Models.userModel import User
+from Utils.revocation import revocations
+from Utils.user_cache import get_principal
 from enum import Enum
 
 
@@ -41,6 +42,9 @@ def token_required(f):
                                      error_message="Authentication required. Please log in to access this page."), 401
 
         decoded = decode_token(token)
+        # Refresh tokens are not access tokens; revoked session families are rejected in memory
+        if decoded and (decoded.get("type") == "refresh" or revocations.is_revoked(decoded.get("fam"))):
+            decoded = None
         if not decoded:
             if is_api_request:
                 return jsonify({"success": False, "message": "Invalid or expired token"}), 401
@@ -49,7 +53,8 @@ def token_required(f):
                                      error_code=401,
                                      error_message="Your session has expired. Please log in again."), 401
 
-        user = User.objects(id=decoded.get("user_id")).first()
+        # Compact cached principal; the full User document loads lazily on demand
+        user = get_principal(decoded.get("user_id"))
         if not user:
             if is_api_request:
                 return jsonify({"success": False, "message": "User not found"}), 404
@@ -58,6 +63,14 @@ def token_required(f):
                                      error_code=404,
                                      error_message="User not found."), 404
 
+        if not user.active or user.changed_password_after(decoded.get("iat")):
+            if is_api_request:
+                return jsonify({"success": False, "message": "Session is no longer valid. Please log in again."}), 401
+            else:
+                return render_template("error.html",
+                                     error_code=401,
+                                     error_message="Your session has expired. Please log in again."), 401
+
         # Attach user to the wrapped function
         return f(user, *args, **kwargs)
 
@@ -0,0 +1,166 @@
+import io
+import mimetypes
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+import httpx
+
+
+# ==================================================
+# HELPERS
+# ==================================================
+def _percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _echo_latencies(label, samples_ms):
+    click.echo(
+        f"{label:<22} n={len(samples_ms):<6} "
+        f"p50={_percentile(samples_ms, 50):7.1f}ms  "
+        f"p95={_percentile(samples_ms, 95):7.1f}ms  "
+        f"p99={_percentile(samples_ms, 99):7.1f}ms  "
+        f"max={max(samples_ms or [0]):7.1f}ms"
+    )
+
+
+# ==================================================
+# CLI BENCHMARK COMMANDS
+# ==================================================
+def register_benchmark_commands(app):
+    """Adds 'flask bench:*' commands that load-test a running server."""
+
+    @click.command("bench:login-storm")
+    @click.option("--base-url", default="http://localhost:4000", help="Server under test")
+    @click.option("--identifier", required=True, help="Email/phone/username of an existing user")
+    @click.option("--password", required=True, help="Password for that user")
+    @click.option("--logins", default=200, help="Total login requests to send")
+    @click.option("--concurrency", default=16, help="Concurrent login clients")
+    @click.option("--probe-path", default="/about", help="Non-auth endpoint sampled during the storm")
+    @click.option("--probe-interval", default=0.05, help="Seconds between probe requests")
+    def login_storm(base_url, identifier, password, logins, concurrency, probe_path, probe_interval):
+        """Measure login throughput and non-auth tail latency during a login storm."""
+        login_ms, probe_ms = [], []
+        statuses = {}
+        lock = threading.Lock()
+        done = threading.Event()
+
+        def do_login(_):
+            with httpx.Client(base_url=base_url, timeout=60.0) as c:
+                started = time.perf_counter()
+                r = c.post("/api/v1/auth/login", json={"identifier": identifier, "password": password})
+                elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                login_ms.append(elapsed)
+                statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+
+        def probe():
+            with httpx.Client(base_url=base_url, timeout=60.0) as c:
+                while not done.is_set():
+                    started = time.perf_counter()
+                    c.get(probe_path)
+                    probe_ms.append((time.perf_counter() - started) * 1000)
+                    time.sleep(probe_interval)
+
+        # Baseline latency of the probe endpoint before the storm
+        with httpx.Client(base_url=base_url, timeout=60.0) as c:
+            baseline_ms = []
+            for _ in range(20):
+                started = time.perf_counter()
+                c.get(probe_path)
+                baseline_ms.append((time.perf_counter() - started) * 1000)
+
+        prober = threading.Thread(target=probe, daemon=True)
+        prober.start()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(do_login, range(logins)))
+        wall = time.perf_counter() - started
+        done.set()
+        prober.join()
+
+        ok = statuses.get(200, 0)
+        click.echo("\n🔐 Login storm\n──────────────────────────────")
+        click.echo(f"Logins sent: {logins}  concurrency: {concurrency}  wall: {wall:.2f}s")
+        click.echo(f"Successful logins/s: {ok / wall:.1f}   status counts: {dict(sorted(statuses.items()))}")
+        _echo_latencies("login", login_ms)
+        _echo_latencies(f"{probe_path} (idle)", baseline_ms)
+        _echo_latencies(f"{probe_path} (storm)", probe_ms)
+
+    @click.command("bench:image-processing")
+    @click.argument("images", nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+    @click.option("--repeat", default=5, help="Times each image is processed")
+    def image_processing(images, repeat):
+        """Compare CPU time per upload of the legacy and the current image pipeline (in-process)."""
+        from PIL import Image
+        from Utils.image_processing import _process_upload, IMAGE_MAX_DIMENSION
+
+        def legacy(data, pil_format):
+            image = Image.open(io.BytesIO(data)).convert("RGB").resize((800, 800))
+            out = io.BytesIO()
+            image.save(out, format=pil_format)
+            return out.getvalue()
+
+        def current(data, pil_format):
+            return _process_upload(data, pil_format, IMAGE_MAX_DIMENSION)[0]
+
+        click.echo("\n🖼️ Image processing (CPU time per image)\n──────────────────────────────")
+        for path in images:
+            with open(path, "rb") as f:
+                data = f.read()
+            pil_format = "PNG" if path.lower().endswith(".png") else "JPEG"
+            click.echo(f"{os.path.basename(path)} ({len(data) / 1024:.0f} KB)")
+            for label, fn in (("legacy", legacy), ("current", current)):
+                cpu_ms, out_bytes = [], 0
+                for _ in range(repeat):
+                    started = time.process_time()
+                    out_bytes = len(fn(data, pil_format))
+                    cpu_ms.append((time.process_time() - started) * 1000)
+                _echo_latencies(f"  {label} cpu", cpu_ms)
+                click.echo(f"  {label} output: {out_bytes / 1024:.0f} KB")
+
+    @click.command("bench:upload")
+    @click.argument("image", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--base-url", default="http://localhost:4000", help="Server under test")
+    @click.option("--uploads", default=50, help="Total uploads to send")
+    @click.option("--concurrency", default=8, help="Concurrent upload clients")
+    def upload(image, base_url, uploads, concurrency):
+        """Measure end-to-end upload latency of /api/v1/users/upload-image-to-allimgs."""
+        with open(image, "rb") as f:
+            data = f.read()
+        mime_type = mimetypes.guess_type(image)[0] or "image/jpeg"
+        upload_ms = []
+        statuses = {}
+        lock = threading.Lock()
+
+        def do_upload(i):
+            with httpx.Client(base_url=base_url, timeout=120.0) as c:
+                started = time.perf_counter()
+                r = c.post("/api/v1/users/upload-image-to-allimgs",
+                           files={"image": (f"bench_{i}_{os.path.basename(image)}", data, mime_type)})
+                elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                upload_ms.append(elapsed)
+                statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(do_upload, range(uploads)))
+        wall = time.perf_counter() - started
+
+        click.echo("\n📤 Upload\n──────────────────────────────")
+        click.echo(f"Uploads sent: {uploads}  concurrency: {concurrency}  wall: {wall:.2f}s")
+        # Every upload sends the same bytes, so all but the first are dedup hits (200)
+        stored = statuses.get(200, 0) + statuses.get(201, 0)
+        click.echo(f"Uploads/s: {stored / wall:.1f}   status counts: {dict(sorted(statuses.items()))}")
+        _echo_latencies("upload", upload_ms)
+
+    app.cli.add_command(login_storm)
+    app.cli.add_command(image_processing)
+    app.cli.add_command(upload)
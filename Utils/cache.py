@@ -0,0 +1,114 @@
+import threading
+import time
+from collections import OrderedDict
+
+# =====================================
+#  CACHE REGISTRY
+# =====================================
+# Every named cache registers itself here so admin endpoints can report hit rates.
+CACHE_REGISTRY = {}
+
+
+def register_cache(name, cache):
+    """Register any object exposing a ``stats()`` method under ``name``."""
+    CACHE_REGISTRY[name] = cache
+    return cache
+
+
+def all_cache_stats() -> dict:
+    """Collect ``stats()`` from every registered cache."""
+    return {name: cache.stats() for name, cache in CACHE_REGISTRY.items()}
+
+
+# =====================================
+#  TTL + LRU CACHE
+# =====================================
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe, per-worker LRU cache whose entries also expire after a TTL.
+
+    Entries may carry their own expiry (``set(..., ttl=...)``) which is capped
+    by the cache-wide ``ttl``. When ``max_bytes`` is given, ``weigher(value)``
+    is used to bound the total size as well as the entry count.
+    """
+
+    def __init__(self, name, max_entries=1024, ttl=60, max_bytes=None, weigher=None):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.weigher = weigher or (lambda value: 0)
+        self._data = OrderedDict()  # key -> (expires_at, weight, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        register_cache(name, self)
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            expires_at, _, value = entry
+            if expires_at <= now:
+                self._remove(key)
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        weight = self.weigher(value)
+        if self.max_bytes is not None and weight > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (time.monotonic() + ttl, weight, value)
+            self._bytes += weight
+            while len(self._data) > self.max_entries or (
+                self.max_bytes is not None and self._bytes > self.max_bytes
+            ):
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def pop(self, key):
+        with self._lock:
+            if key in self._data:
+                return self._remove(key)[2]
+        return None
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def _remove(self, key):
+        entry = self._data.pop(key)
+        self._bytes -= entry[1]
+        return entry
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,334 @@
+import hashlib
+import logging
+import os
+from datetime import datetime, timedelta
+
+import click
+from bson import ObjectId
+from flask.cli import with_appcontext
+from mongoengine import NotUniqueError
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from Models.conversationModel import Conversation
+from Models.messageFingerprintModel import MessageFingerprint
+from Models.messageModel import Message
+from Models.userModel import User
+from Utils.cache import TTLCache
+from Utils.profile_fragments import bump_content_version
+from Utils.pubsub import broadcast, on_broadcast, publish_to_user
+
+logger = logging.getLogger(__name__)
+
+SNIPPET_LENGTH = 140
+UNREAD_COUNT_CACHE_TTL = int(os.getenv("UNREAD_COUNT_CACHE_TTL", 15))
+DUPLICATE_MESSAGE_WINDOW_SECONDS = 30
+
+# user id -> unread message count; dropped in every worker whenever the counter changes
+unread_count_cache = TTLCache("unread_counts", max_entries=8192, ttl=UNREAD_COUNT_CACHE_TTL)
+# fingerprints this worker accepted within the duplicate window: repeats are rejected without a query
+seen_fingerprints = TTLCache("message_fingerprints", max_entries=16384, ttl=DUPLICATE_MESSAGE_WINDOW_SECONDS)
+
+
+def _ref_id(value):
+    """ObjectId of a reference given as a document, LazyReference or id."""
+    return ObjectId(str(getattr(value, "id", value)))
+
+
+def conversation_key(item, user_a, user_b) -> str:
+    low, high = sorted([str(_ref_id(user_a)), str(_ref_id(user_b))])
+    return f"{_ref_id(item)}:{low}:{high}"
+
+
+def display_names(user_ids):
+    """user id -> "First Last", falling back to the username, in one query."""
+    if not user_ids:
+        return {}
+    return {
+        u['_id']: f"{u.get('first_name') or ''} {u.get('last_name') or ''}".strip() or u.get('name') or 'Unknown'
+        for u in User.objects(id__in=list(user_ids)).only('first_name', 'last_name', 'name').as_pymongo()
+    }
+
+
+def _snippet(body, title) -> str:
+    text = (body or title or "").strip().replace("\n", " ")
+    return text if len(text) <= SNIPPET_LENGTH else text[:SNIPPET_LENGTH - 1] + "…"
+
+
+# ==================================================
+# DUPLICATE SUPPRESSION
+# ==================================================
+def message_fingerprint(sender, receiver, item, title, body) -> str:
+    parts = [str(_ref_id(sender)), str(_ref_id(receiver)), str(_ref_id(item)), title or "", body or ""]
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+
+def claim_fingerprint(fingerprint) -> bool:
+    """Reserve ``fingerprint`` for the duplicate window; False if it is already taken.
+
+    Repeats seen by this worker cost nothing; otherwise the unique index on
+    MessageFingerprint decides atomically, so concurrent double-submits
+    cannot both get through.
+    """
+    if seen_fingerprints.get(fingerprint):
+        return False
+    try:
+        MessageFingerprint(fingerprint=fingerprint).save(force_insert=True)
+    except NotUniqueError:
+        # Taken, unless it is an expired entry the TTL monitor has not removed yet
+        cutoff = datetime.utcnow() - timedelta(seconds=DUPLICATE_MESSAGE_WINDOW_SECONDS)
+        reclaimed = MessageFingerprint.objects(fingerprint=fingerprint, created_at__lt=cutoff).update_one(
+            set__created_at=datetime.utcnow()
+        )
+        if not reclaimed:
+            return False
+    seen_fingerprints.set(fingerprint, True)
+    return True
+
+
+def release_fingerprint(fingerprint):
+    """Give up a claim whose message was never stored, so a retry is not a duplicate."""
+    seen_fingerprints.pop(fingerprint)
+    MessageFingerprint.objects(fingerprint=fingerprint).delete()
+
+
+# ==================================================
+# INCREMENTAL UPDATES
+# ==================================================
+@on_broadcast("unread_counts.invalidate")
+def _on_unread_invalidate(data):
+    if data.get("all"):
+        unread_count_cache.clear()
+    for user_id in data.get("ids") or []:
+        unread_count_cache.pop(user_id)
+
+
+def _update_unread(user_id, guard, update) -> int:
+    """Apply ``update`` to the user's counter; returns the new unread count.
+
+    The count is cached here, dropped in the other workers, and sent along
+    with the SSE event so the badge does not need to ask for it again.
+    """
+    key = str(user_id)
+    row = User._get_collection().find_one_and_update(
+        {"_id": ObjectId(key), **guard}, update,
+        projection={"unread_messages": 1}, return_document=ReturnDocument.AFTER,
+    )
+    if row is None:
+        return get_unread_count(key)  # guard failed: the counter did not change
+    unread = row.get("unread_messages", 0)
+    if unread < 0:
+        # A concurrent reconcile or single read already counted some of these
+        User.objects(id=key, unread_messages__lt=0).update_one(set__unread_messages=0)
+        unread = 0
+    unread_count_cache.set(key, unread)
+    broadcast("unread_counts.invalidate", {"ids": [key]})
+    return unread
+
+
+def record_message(msg):
+    """Fold a newly saved message into its conversation.
+
+    Counters and ``last_message_at`` (``$max``) go in one upsert; the preview
+    fields are then set only if this message is still the newest, so a message
+    whose write lands late never overwrites a newer preview.
+    """
+    sender, receiver = _ref_id(msg.sender), _ref_id(msg.receiver)
+    low, high = sorted([sender, receiver], key=str)
+    update = {
+        "$setOnInsert": {"item": _ref_id(msg.item), "participants": [low, high],
+                         "created_at": datetime.utcnow()},
+        "$max": {"last_message_at": msg.created_at},
+        "$inc": {"message_count": 1, f"unread.{receiver}": 1},
+    }
+    collection = Conversation._get_collection()
+    try:
+        collection.update_one({"key": msg.conversation_key}, update, upsert=True)
+    except DuplicateKeyError:
+        # Two first messages raced on the unique key; the other insert won, so update it
+        collection.update_one({"key": msg.conversation_key}, update)
+    # Messages created at the same instant: the higher id wins the preview
+    collection.update_one(
+        {"key": msg.conversation_key, "last_message_at": msg.created_at,
+         "$or": [{"last_message": {"$exists": False}}, {"last_message": {"$lte": msg.id}}]},
+        {"$set": {"last_message": msg.id, "last_sender": sender,
+                  "last_snippet": _snippet(msg.body, msg.title)}},
+    )
+
+    unread = _update_unread(receiver, {}, {"$inc": {"unread_messages": 1, "content_version": 1}})
+    publish_to_user(receiver, "message", {
+        "unread": unread,
+        "id": str(msg.id),
+        "conversation_key": msg.conversation_key,
+        "item_id": str(_ref_id(msg.item)),
+        "sender_id": str(sender),
+        "title": msg.title,
+        "snippet": _snippet(msg.body, msg.title),
+        "created_at": msg.created_at.isoformat() if msg.created_at else None,
+    })
+
+
+def record_read(msg):
+    """Decrement the reader's unread counter after ``msg`` went from unread to read."""
+    receiver = str(_ref_id(msg.receiver))
+    unread = _update_unread(receiver, {"unread_messages": {"$gt": 0}}, {"$inc": {"unread_messages": -1}})
+    bump_content_version(receiver)
+    # Read receipt for the sender; the reader's other tabs update their badge
+    receipt = {"id": str(msg.id), "conversation_key": msg.conversation_key, "reader_id": receiver}
+    publish_to_user(_ref_id(msg.sender), "read", receipt)
+    publish_to_user(receiver, "read", dict(receipt, unread=unread))
+    if msg.conversation_key:
+        Conversation._get_collection().update_one(
+            {"key": msg.conversation_key, f"unread.{receiver}": {"$gt": 0}},
+            {"$inc": {f"unread.{receiver}": -1}},
+        )
+
+
+def record_bulk_read(receiver_id, rows, count):
+    """Sync the counters after a bulk unread -> read update.
+
+    ``rows`` are the messages (``_id``, ``sender``, ``conversation_key``) that
+    were unread before the update and ``count`` is how many it flipped. The
+    affected threads get their unread count recomputed rather than
+    decremented, since a concurrent single read may have flipped some of them.
+    """
+    if not count:
+        return
+    receiver = str(_ref_id(receiver_id))
+    unread = _update_unread(receiver, {}, {"$inc": {"unread_messages": -count, "content_version": 1}})
+
+    keys = {r["conversation_key"] for r in rows if r.get("conversation_key")}
+    if keys:
+        remaining = {
+            row["_id"]: row["count"]
+            for row in Message._get_collection().aggregate([
+                {"$match": {"conversation_key": {"$in": list(keys)},
+                            "receiver": ObjectId(receiver), "read": False}},
+                {"$group": {"_id": "$conversation_key", "count": {"$sum": 1}}},
+            ])
+        }
+        Conversation._get_collection().bulk_write([
+            UpdateOne({"key": key}, {"$set": {f"unread.{receiver}": remaining.get(key, 0)}})
+            for key in keys
+        ], ordered=False)
+
+    # One receipt per sender instead of one per message
+    by_sender = {}
+    for r in rows:
+        by_sender.setdefault(r["sender"], []).append(str(r["_id"]))
+    for sender, ids in by_sender.items():
+        publish_to_user(sender, "read", {"ids": ids, "reader_id": receiver})
+    publish_to_user(receiver, "read", {"ids": [str(r["_id"]) for r in rows], "reader_id": receiver,
+                                       "unread": unread})
+
+
+def get_unread_count(user_id) -> int:
+    """The user's unread message counter, served from a short-lived cache."""
+    key = str(user_id)
+    count = unread_count_cache.get(key)
+    if count is None:
+        row = User.objects(id=key).only('unread_messages').as_pymongo().first()
+        count = (row or {}).get("unread_messages", 0)
+        unread_count_cache.set(key, count)
+    return count
+
+
+# ==================================================
+# REBUILD
+# ==================================================
+def rebuild_conversations(batch_size=1000):
+    """Recompute every conversation (and Message.conversation_key) from messages.
+
+    Used once for messages sent before conversations existed, and to repair
+    drift. Returns the number of conversations written.
+    """
+    threads = {}
+    key_updates = []
+    fields = {"sender": 1, "receiver": 1, "item": 1, "title": 1, "body": 1,
+              "created_at": 1, "read": 1, "conversation_key": 1}
+    cursor = Message._get_collection().find({}, fields).sort([("created_at", 1), ("_id", 1)])
+    for row in cursor:
+        if not (row.get("sender") and row.get("receiver") and row.get("item")):
+            continue
+        key = conversation_key(row["item"], row["sender"], row["receiver"])
+        if row.get("conversation_key") != key:
+            key_updates.append(UpdateOne({"_id": row["_id"]}, {"$set": {"conversation_key": key}}))
+            if len(key_updates) >= batch_size:
+                Message._get_collection().bulk_write(key_updates, ordered=False)
+                key_updates = []
+
+        low, high = sorted([row["sender"], row["receiver"]], key=str)
+        thread = threads.setdefault(key, {
+            "item": row["item"], "participants": [low, high], "message_count": 0,
+            "unread": {str(low): 0, str(high): 0}, "created_at": row.get("created_at"),
+        })
+        thread["message_count"] += 1
+        if not row.get("read"):
+            thread["unread"][str(row["receiver"])] += 1
+        thread.update({
+            "last_message": row["_id"], "last_sender": row["sender"],
+            "last_snippet": _snippet(row.get("body"), row.get("title")),
+            "last_message_at": row.get("created_at"),
+        })
+    if key_updates:
+        Message._get_collection().bulk_write(key_updates, ordered=False)
+
+    ops = [UpdateOne({"key": key}, {"$set": thread}, upsert=True) for key, thread in threads.items()]
+    for start in range(0, len(ops), batch_size):
+        Conversation._get_collection().bulk_write(ops[start:start + batch_size], ordered=False)
+    return len(ops)
+
+
+def reconcile_unread_counts(batch_size=1000):
+    """Reset every User.unread_messages to the true count of unread messages.
+
+    Returns the number of users whose counter had drifted.
+    """
+    actual = {
+        row["_id"]: row["count"]
+        for row in Message._get_collection().aggregate([
+            {"$match": {"read": False}},
+            {"$group": {"_id": "$receiver", "count": {"$sum": 1}}},
+        ], allowDiskUse=True)
+    }
+    ops = []
+    users = User._get_collection().find(
+        {"$or": [{"_id": {"$in": list(actual)}}, {"unread_messages": {"$gt": 0}}]},
+        {"unread_messages": 1},
+    )
+    for row in users:
+        expected = actual.get(row["_id"], 0)
+        if row.get("unread_messages", 0) != expected:
+            ops.append(UpdateOne({"_id": row["_id"]}, {"$set": {"unread_messages": expected}}))
+    for start in range(0, len(ops), batch_size):
+        User._get_collection().bulk_write(ops[start:start + batch_size], ordered=False)
+    unread_count_cache.clear()
+    broadcast("unread_counts.invalidate", {"all": True})
+    return len(ops)
+
+
+# ==================================================
+# CLI COMMANDS
+# ==================================================
+def register_message_commands(app):
+    """Adds 'flask messages:*' maintenance commands."""
+
+    @click.command("messages:rebuild-conversations")
+    @with_appcontext
+    def rebuild_conversations_command():
+        """Recompute conversation threads and their counters from all messages."""
+        written = rebuild_conversations()
+        click.echo(f"💬 Rebuilt {written} conversations")
+        logger.info(f"💬 Rebuilt {written} conversations")
+
+    @click.command("messages:reconcile-unread")
+    @with_appcontext
+    def reconcile_unread_command():
+        """Repair per-user unread counters against the messages collection (run from cron)."""
+        fixed = reconcile_unread_counts()
+        click.echo(f"📬 Reconciled unread counters ({fixed} users corrected)")
+        if fixed:
+            logger.warning(f"📬 Unread counters had drifted for {fixed} users")
+
+    app.cli.add_command(rebuild_conversations_command)
+    app.cli.add_command(reconcile_unread_command)
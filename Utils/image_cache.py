@@ -0,0 +1,178 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import namedtuple
+
+from Utils.cache import TTLCache
+from Utils.pubsub import broadcast, on_broadcast
+
+logger = logging.getLogger(__name__)
+
+# =====================================
+#  CONFIGURATION
+# =====================================
+IMAGE_MEMORY_MAX_BYTES = int(os.getenv("IMAGE_MEMORY_MAX_BYTES", 64 * 1024 * 1024))
+IMAGE_MEMORY_MAX_ITEM_BYTES = int(os.getenv("IMAGE_MEMORY_MAX_ITEM_BYTES", 256 * 1024))
+IMAGE_DISK_CACHE_DIR = os.getenv("IMAGE_DISK_CACHE_DIR", os.path.join("cache", "images"))
+IMAGE_DISK_MAX_BYTES = int(os.getenv("IMAGE_DISK_MAX_BYTES", 1024 * 1024 * 1024))
+IMAGE_DISK_MAX_ITEM_BYTES = int(os.getenv("IMAGE_DISK_MAX_ITEM_BYTES", 16 * 1024 * 1024))
+# Content-addressed names never change; other names (e.g. default.jpg) may be replaced
+IMAGE_CACHE_TTL = int(os.getenv("IMAGE_CACHE_TTL", 24 * 3600))
+IMAGE_MUTABLE_CACHE_TTL = int(os.getenv("IMAGE_MUTABLE_CACHE_TTL", 300))
+
+ImageMeta = namedtuple("ImageMeta", ["etag", "last_modified", "content_type", "length"])
+
+
+# =====================================
+#  MEMORY TIER
+# =====================================
+# filename -> (ImageMeta, bytes); bounded by total bytes as well as entry count
+memory_tier = TTLCache(
+    "images_memory",
+    max_entries=16384,
+    ttl=IMAGE_CACHE_TTL,
+    max_bytes=IMAGE_MEMORY_MAX_BYTES,
+    weigher=lambda entry: len(entry[1]),
+)
+
+
+# =====================================
+#  DISK TIER
+# =====================================
+class DiskImageCache:
+    """Size-capped, content-addressed image cache on local disk.
+
+    Files are stored as ``<root>/<sha256[:2]>/<sha256>`` and shared by all
+    workers on the host; each worker keeps its own filename -> file index.
+    Hits bump the file mtime, and a periodic sweep evicts the least recently
+    used files once the directory exceeds ``max_bytes``.
+    """
+
+    def __init__(self, root, max_bytes, max_item_bytes):
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes
+        self.index = TTLCache("images_disk", max_entries=65536, ttl=IMAGE_CACHE_TTL)
+        self._written_since_sweep = max_bytes  # sweep once on first write
+        self._sweep_lock = threading.Lock()
+
+    def get(self, filename):
+        """Return (ImageMeta, path) or None."""
+        entry = self.index.get(filename)
+        if entry is None:
+            return None
+        try:
+            os.utime(entry[1])
+        except OSError:
+            # Evicted by another worker's sweep
+            self.index.pop(filename)
+            return None
+        return entry
+
+    def put_stream(self, filename, meta, chunks, ttl):
+        """Write ``chunks`` to a content-addressed file and index it. Returns the path."""
+        tmp_dir = os.path.join(self.root, "tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        tmp_path = os.path.join(tmp_dir, uuid.uuid4().hex)
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with open(tmp_path, "wb") as f:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    size += len(chunk)
+                    f.write(chunk)
+            hexdigest = digest.hexdigest()
+            final_dir = os.path.join(self.root, hexdigest[:2])
+            os.makedirs(final_dir, exist_ok=True)
+            path = os.path.join(final_dir, hexdigest)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        self.index.set(filename, (meta, path), ttl=ttl)
+        self._written_since_sweep += size
+        if self._written_since_sweep >= self.max_bytes // 10:
+            self.sweep()
+        return path
+
+    def invalidate(self, filename):
+        self.index.pop(filename)
+
+    def sweep(self):
+        """Evict least-recently-used files until the cache is under 90% of its cap."""
+        if not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            self._written_since_sweep = 0
+            files, total = [], 0
+            now = time.time()
+            for dirpath, _, filenames in os.walk(self.root):
+                for name in filenames:
+                    path = os.path.join(dirpath, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    # Leftovers from interrupted writes
+                    if os.path.basename(dirpath) == "tmp" and st.st_mtime < now - 3600:
+                        os.remove(path)
+                        continue
+                    files.append((st.st_mtime, st.st_size, path))
+                    total += st.st_size
+            if total <= self.max_bytes:
+                return
+            target = int(self.max_bytes * 0.9)
+            removed = 0
+            for _, size, path in sorted(files):
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                    removed += 1
+                except OSError:
+                    continue
+            logger.info(f"🧹 Image disk cache evicted {removed} files")
+        finally:
+            self._sweep_lock.release()
+
+    def stats(self) -> dict:
+        return self.index.stats()
+
+
+disk_tier = DiskImageCache(IMAGE_DISK_CACHE_DIR, IMAGE_DISK_MAX_BYTES, IMAGE_DISK_MAX_ITEM_BYTES)
+
+
+def _drop_local(filenames):
+    for filename in filenames:
+        memory_tier.pop(filename)
+        disk_tier.invalidate(filename)
+
+
+@on_broadcast("images.invalidate")
+def _on_invalidate(data):
+    _drop_local(data.get("filenames") or [])
+
+
+def invalidate_images(filenames):
+    """Drop files from both tiers in this worker and, via a broadcast, in every
+    other worker (call after replacing or deleting files, also from CLI commands).
+
+    Workers that miss the broadcast (database unreachable) still drop the
+    entries after IMAGE_CACHE_TTL, or IMAGE_MUTABLE_CACHE_TTL for mutable names.
+    """
+    filenames = [f for f in filenames if f]
+    if not filenames:
+        return
+    _drop_local(filenames)
+    broadcast("images.invalidate", {"filenames": filenames})
+
+
+def invalidate_image(filename):
+    invalidate_images([filename])
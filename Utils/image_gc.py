@@ -0,0 +1,289 @@
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+
+import click
+from bson import ObjectId
+from flask.cli import with_appcontext
+
+from Models.allImgsModel import AllImgs
+from Utils.image_cache import invalidate_image, invalidate_images
+from Utils.image_store import (
+    CONTENT_ADDRESSED_NAME, PROTECTED_IMAGES,
+    get_backend, put_blob, read_blob, delete_blob, discard_duplicate_blob, to_signed64
+)
+
+logger = logging.getLogger(__name__)
+
+# ==================================================
+# REFERENCED SET
+# ==================================================
+def _compact(filename):
+    """Content-addressed names are kept as their 32 raw digest bytes instead of a
+    ~70 character str; variants (``__w<width>``) and legacy names are kept as-is
+    so they never collide with the original's digest."""
+    match = CONTENT_ADDRESSED_NAME.match(filename)
+    return bytes.fromhex(match.group(1)) if match and match.group(2) is None else filename
+
+
+def _distinct_stream(model, field):
+    """Distinct values of a (list) field, streamed by the server instead of
+    returned in one ``distinct`` document, which is capped at 16MB."""
+    pipeline = [
+        {"$match": {field: {"$exists": True, "$ne": None}}},
+        {"$project": {"_id": 0, field: 1}},
+        {"$unwind": f"${field}"},
+        {"$group": {"_id": f"${field}"}},
+    ]
+    for row in model._get_collection().aggregate(pipeline, allowDiskUse=True, batchSize=5000):
+        if isinstance(row["_id"], str):
+            yield row["_id"]
+
+
+def build_referenced_set():
+    from Models.claimedItemModel import ClaimedItem
+    from Models.lostItemModel import LostItem
+    from Models.messageModel import Message
+    from Models.userModel import User
+
+    referenced = set()
+    for model, field in ((LostItem, "images"), (ClaimedItem, "images"),
+                         (Message, "images"), (User, "photo")):
+        for filename in _distinct_stream(model, field):
+            referenced.add(_compact(filename))
+    return referenced
+
+
+# ==================================================
+# CHECKPOINT
+# ==================================================
+def _load_checkpoint(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_checkpoint(path, state):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+# ==================================================
+# COLLECTION
+# ==================================================
+def _in_gridfs(row):
+    return row.get("storage") in (None, "gridfs")
+
+
+def _delete_batch(doomed):
+    """Remove AllImgs documents and their blobs; GridFS files go in two bulk deletes."""
+    db = AllImgs._get_db()
+    file_ids = [row["file"] for row in doomed if _in_gridfs(row) and row.get("file")]
+    if file_ids:
+        db["fs.chunks"].delete_many({"files_id": {"$in": file_ids}})
+        db["fs.files"].delete_many({"_id": {"$in": file_ids}})
+    for row in doomed:
+        if not _in_gridfs(row) and row.get("storage_key"):
+            get_backend(row["storage"]).delete(AllImgs._from_son(row))
+    AllImgs._get_collection().delete_many({"_id": {"$in": [row["_id"] for row in doomed]}})
+    # One broadcast per batch: web workers drop the swept files from their caches
+    invalidate_images([row["filename"] for row in doomed])
+
+
+def collect_orphans(grace_hours=24, batch_size=500, dry_run=False, checkpoint=None, echo=click.echo):
+    """Delete images nothing references that are older than the grace period.
+
+    AllImgs is streamed in _id order so the job can resume from ``checkpoint``
+    after an interruption. Variants live and die with their source image.
+    Returns (scanned, deleted, reclaimed_bytes).
+    """
+    state = (_load_checkpoint(checkpoint) if checkpoint and not dry_run else None) or {
+        "last_id": None, "scanned": 0, "deleted": 0, "bytes": 0,
+    }
+    if state["last_id"]:
+        echo(f"↩️ Resuming after {state['last_id']} ({state['deleted']} files deleted so far)")
+
+    referenced = build_referenced_set()
+    echo(f"🔗 {len(referenced)} referenced images")
+
+    cutoff = datetime.utcnow() - timedelta(hours=grace_hours)
+    query = {
+        "filename": {"$nin": list(PROTECTED_IMAGES)},
+        "uploaded_at": {"$lt": cutoff},
+        # Re-uploading existing content hands the old file out again
+        "$or": [{"last_used_at": None}, {"last_used_at": {"$lt": cutoff}}],
+    }
+    if state["last_id"]:
+        query["_id"] = {"$gt": ObjectId(state["last_id"])}
+
+    fs_files = AllImgs._get_db()["fs.files"]
+    cursor = AllImgs._get_collection().find(
+        query, {"filename": 1, "variant_of": 1, "file": 1, "storage": 1, "storage_key": 1, "length": 1}
+    ).sort("_id", 1).batch_size(batch_size)
+
+    def flush(batch):
+        doomed = [
+            row for row in batch
+            if _compact(row.get("variant_of") or row["filename"]) not in referenced
+        ]
+        if doomed:
+            file_ids = [row["file"] for row in doomed if _in_gridfs(row) and row.get("file")]
+            sizes = fs_files.find({"_id": {"$in": file_ids}}, {"length": 1})
+            state["bytes"] += sum(doc.get("length", 0) for doc in sizes)
+            state["bytes"] += sum(row.get("length") or 0 for row in doomed if not _in_gridfs(row))
+            state["deleted"] += len(doomed)
+            if not dry_run:
+                _delete_batch(doomed)
+        state["scanned"] += len(batch)
+        state["last_id"] = str(batch[-1]["_id"])
+        if checkpoint and not dry_run:
+            _save_checkpoint(checkpoint, state)
+
+    batch = []
+    for row in cursor:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+    if checkpoint and not dry_run and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    return state["scanned"], state["deleted"], state["bytes"]
+
+
+# ==================================================
+# MIGRATION
+# ==================================================
+def migrate_images(target, source=None, limit=0, keep_source=False, echo=click.echo):
+    """Copy each image to ``target``, repoint its document, then drop the old blob.
+
+    The document is only switched if it still points at the old copy, so a
+    concurrent replacement is never overwritten. Mutable protected images
+    (default.jpg) stay in GridFS, where they can be replaced in place.
+    Returns (moved, failed).
+    """
+    backend = get_backend(target)
+    query = {"filename__nin": list(PROTECTED_IMAGES)}
+    if target == "gridfs":
+        query["storage__nin"] = [None, "gridfs"]
+    else:
+        query["storage__ne"] = target
+    if source == "gridfs":
+        query["storage__in"] = [None, "gridfs"]
+    elif source:
+        query["storage"] = source
+
+    moved = failed = 0
+    for img_doc in AllImgs.objects(**query).no_cache().timeout(False):
+        if limit and moved >= limit:
+            break
+        try:
+            data = read_blob(img_doc)
+            copy = AllImgs(filename=img_doc.filename)
+            put_blob(copy, data, img_doc.content_type or "image/jpeg", backend=backend)
+            update = {"set__storage": copy.storage, "set__length": copy.length}
+            if copy.storage == "gridfs":
+                update["set__file"] = copy.file
+                update["unset__storage_key"] = True
+            else:
+                update["set__storage_key"] = copy.storage_key
+                update["unset__file"] = True
+            switched = AllImgs.objects(
+                id=img_doc.id, storage__in=[img_doc.storage] + ([None] if img_doc.storage == "gridfs" else [])
+            ).update_one(**update)
+            if not switched:
+                discard_duplicate_blob(copy)
+                continue
+            if not keep_source:
+                delete_blob(img_doc)
+            invalidate_image(img_doc.filename)
+            moved += 1
+        except Exception as e:
+            failed += 1
+            echo(f"⚠️ Could not migrate {img_doc.filename}: {e}")
+    logger.info(f"🚚 Migrated {moved} images to {target} ({failed} failed)")
+    return moved, failed
+
+
+# ==================================================
+# PERCEPTUAL HASH BACKFILL
+# ==================================================
+def backfill_hashes(limit=0, echo=click.echo):
+    """Compute dHash/pHash for images uploaded before hashing existed.
+    Returns (hashed, failed)."""
+    from Utils.image_processing import hash_image
+
+    hashed = failed = 0
+    for img_doc in AllImgs.objects(phash=None, variant_of=None).no_cache().timeout(False):
+        if limit and hashed >= limit:
+            break
+        try:
+            dhash, phash = hash_image(read_blob(img_doc))
+            AllImgs.objects(id=img_doc.id).update_one(
+                set__dhash=to_signed64(dhash), set__phash=to_signed64(phash)
+            )
+            hashed += 1
+        except Exception as e:
+            failed += 1
+            echo(f"⚠️ Could not hash {img_doc.filename}: {e}")
+    return hashed, failed
+
+
+# ==================================================
+# CLI COMMANDS
+# ==================================================
+def register_image_commands(app):
+    """Adds 'flask images:*' maintenance commands."""
+
+    @click.command("images:gc")
+    @with_appcontext
+    @click.option("--dry-run", is_flag=True, help="Only report what would be deleted")
+    @click.option("--grace-hours", default=24, help="Never delete images younger than this")
+    @click.option("--batch-size", default=500, help="Images examined per delete batch")
+    @click.option("--checkpoint", default=os.path.join("cache", "images_gc.json"),
+                  help="Progress file used to resume an interrupted run")
+    def images_gc(dry_run, grace_hours, batch_size, checkpoint):
+        """Delete uploaded images that no item, message or profile references."""
+        scanned, deleted, reclaimed = collect_orphans(
+            grace_hours=grace_hours, batch_size=batch_size, dry_run=dry_run, checkpoint=checkpoint
+        )
+        click.echo("\n🗑️ Image GC" + (" (dry run)" if dry_run else "") + "\n──────────────────────────────")
+        click.echo(f"Scanned: {scanned}   {'Reclaimable' if dry_run else 'Deleted'}: {deleted} files, "
+                   f"{reclaimed / (1024 * 1024):.1f} MB")
+        if not dry_run:
+            logger.info(f"🗑️ Image GC deleted {deleted} files ({reclaimed} bytes)")
+
+    @click.command("images:migrate")
+    @with_appcontext
+    @click.option("--to", "target", required=True, type=click.Choice(["gridfs", "filesystem", "s3"]),
+                  help="Backend to move images to")
+    @click.option("--from", "source", default=None, type=click.Choice(["gridfs", "filesystem", "s3"]),
+                  help="Only move images currently in this backend")
+    @click.option("--limit", default=0, help="Stop after this many images (0 = all)")
+    @click.option("--keep-source", is_flag=True, help="Leave the old copy in place")
+    def images_migrate(target, source, limit, keep_source):
+        """Move image bytes between storage backends."""
+        moved, failed = migrate_images(target, source=source, limit=limit, keep_source=keep_source)
+        click.echo("\n🚚 Image migration\n──────────────────────────────")
+        click.echo(f"Moved to {target}: {moved}   Failed: {failed}")
+
+    @click.command("images:hash")
+    @with_appcontext
+    @click.option("--limit", default=0, help="Stop after this many images (0 = all)")
+    def images_hash(limit):
+        """Backfill perceptual hashes used by the similar-items lookup."""
+        hashed, failed = backfill_hashes(limit=limit)
+        click.echo("\n🧭 Perceptual hashes\n──────────────────────────────")
+        click.echo(f"Hashed: {hashed}   Failed: {failed}")
+
+    app.cli.add_command(images_gc)
+    app.cli.add_command(images_migrate)
+    app.cli.add_command(images_hash)
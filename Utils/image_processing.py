@@ -0,0 +1,136 @@
+import io
+import math
+import os
+from collections import namedtuple
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from Utils.appError import AppError
+from Utils.worker_pool import BoundedProcessPool
+
+# =====================================
+#  CONFIGURATION
+# =====================================
+IMAGE_MAX_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION", 800))
+IMAGE_POOL_WORKERS = int(os.getenv("IMAGE_POOL_WORKERS", 2))
+IMAGE_POOL_MAX_PENDING = int(os.getenv("IMAGE_POOL_MAX_PENDING", 8))
+
+# Bytes to store plus 64-bit perceptual hashes (unsigned ints) used for similarity search
+ProcessedImage = namedtuple("ProcessedImage", ["data", "dhash", "phash"])
+
+image_pool = BoundedProcessPool(
+    "image",
+    max_workers=IMAGE_POOL_WORKERS,
+    max_pending=IMAGE_POOL_MAX_PENDING,
+    timeout=60,
+)
+
+
+# =====================================
+#  POOL TASKS (must stay top-level to be picklable; PIL-only imports)
+# =====================================
+def _encode(image, pil_format: str) -> bytes:
+    """Encode without EXIF/ICC/text chunks, so client metadata is stripped."""
+    if pil_format == "JPEG" and image.mode != "RGB":
+        image = image.convert("RGB")
+    elif image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA")
+    # Some encoders (PNG, WebP) fall back to image.info for icc_profile/exif
+    image.info = {}
+
+    out = io.BytesIO()
+    if pil_format == "JPEG":
+        image.save(out, format="JPEG", quality=85, optimize=True, progressive=True)
+    elif pil_format == "WEBP":
+        image.save(out, format="WEBP", quality=80, method=4)
+    else:
+        image.save(out, format="PNG", optimize=True, icc_profile=None)
+    return out.getvalue()
+
+
+def _bounded(image, width: int, height: int):
+    """Shrink to fit within width x height keeping aspect ratio (never upscales).
+
+    ``draft`` lets libjpeg decode at 1/2, 1/4 or 1/8 scale, and
+    ``reducing_gap`` makes ``thumbnail`` use ``reduce`` (cheap box
+    downscale) before the final high-quality resample.
+    """
+    if image.format == "JPEG":
+        image.draft("RGB", (width, height))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((width, height), Image.LANCZOS, reducing_gap=2.0)
+    return image
+
+
+# DCT-II basis for the 8 lowest frequencies of a 32-sample signal
+_DCT_BASIS = [[math.cos((2 * x + 1) * u * math.pi / 64) for x in range(32)] for u in range(8)]
+
+
+def _dhash(image) -> int:
+    """Difference hash: is each pixel darker than its right neighbour, on a 9x8 grayscale."""
+    pixels = image.convert("L").resize((9, 8), Image.LANCZOS).tobytes()
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            i = row * 9 + col
+            bits = (bits << 1) | (pixels[i] < pixels[i + 1])
+    return bits
+
+
+def _phash(image) -> int:
+    """DCT hash: low-frequency 8x8 DCT coefficients of a 32x32 grayscale, thresholded
+    at their median. Robust to re-encoding, resizing and small colour changes."""
+    pixels = image.convert("L").resize((32, 32), Image.LANCZOS).tobytes()
+    rows = [
+        [sum(b * p for b, p in zip(basis, pixels[y * 32:(y + 1) * 32])) for basis in _DCT_BASIS]
+        for y in range(32)
+    ]
+    coefficients = [
+        sum(_DCT_BASIS[v][y] * rows[y][u] for y in range(32))
+        for v in range(8) for u in range(8)
+    ]
+    median = sorted(coefficients)[32]
+    bits = 0
+    for c in coefficients:
+        bits = (bits << 1) | (c > median)
+    return bits
+
+
+def _process_upload(data: bytes, pil_format: str, max_dimension: int):
+    image = _bounded(Image.open(io.BytesIO(data)), max_dimension, max_dimension)
+    return _encode(image, pil_format), _dhash(image), _phash(image)
+
+
+def _hash_image(data: bytes):
+    image = _bounded(Image.open(io.BytesIO(data)), 256, 256)
+    return _dhash(image), _phash(image)
+
+
+def render_variant(data: bytes, width: int, pil_format: str) -> bytes:
+    """Resize to ``width`` (keeping aspect ratio) and re-encode image bytes."""
+    image = Image.open(io.BytesIO(data))
+    if width:
+        image = _bounded(image, width, image.height * 16)
+    return _encode(image, pil_format)
+
+
+# =====================================
+#  PUBLIC HELPERS
+# =====================================
+def process_upload(data: bytes, mime_type: str) -> ProcessedImage:
+    """Orient, bound to IMAGE_MAX_DIMENSION, re-encode and hash an upload in the image pool."""
+    pil_format = "PNG" if mime_type == "image/png" else "JPEG"
+    try:
+        return ProcessedImage(*image_pool.run(_process_upload, data, pil_format, IMAGE_MAX_DIMENSION))
+    except (UnidentifiedImageError, Image.DecompressionBombError, SyntaxError, OSError):
+        raise AppError("Invalid or corrupt image file", 400)
+
+
+def process_variant(data: bytes, width: int, pil_format: str) -> bytes:
+    """Render a variant in the image pool."""
+    return image_pool.run(render_variant, data, width, pil_format)
+
+
+def hash_image(data: bytes):
+    """(dhash, phash) of stored image bytes, for backfilling older uploads."""
+    return image_pool.run(_hash_image, data)
@@ -0,0 +1,253 @@
+import logging
+import os
+from datetime import timezone
+
+from flask import Response, request, send_file
+
+from Models.allImgsModel import AllImgs
+from Utils.appError import AppError
+from Utils.image_store import CONTENT_ADDRESSED_NAME, get_backend, read_blob
+from Utils.image_cache import (
+    memory_tier, disk_tier, ImageMeta,
+    IMAGE_MEMORY_MAX_ITEM_BYTES, IMAGE_CACHE_TTL, IMAGE_MUTABLE_CACHE_TTL
+)
+
+logger = logging.getLogger(__name__)
+
+# =====================================
+#  HTTP CACHING
+# =====================================
+# Names that are a SHA-256 of the content (or a fixed variant of one) never change,
+# so they can be cached forever (see image_store.CONTENT_ADDRESSED_NAME)
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+IMAGE_MAX_AGE_SECONDS = int(os.getenv("IMAGE_MAX_AGE_SECONDS", 3600))
+
+# Filesystem backend: let the front proxy send the bytes.
+#   "x-accel-redirect" (nginx) -> internal location IMAGE_FS_ACCEL_PREFIX aliased to IMAGE_FS_ROOT
+#   "x-sendfile" (Apache mod_xsendfile, lighttpd) -> absolute path
+#   ""                         -> Flask send_file
+IMAGE_FS_SERVE = os.getenv("IMAGE_FS_SERVE", "").lower()
+IMAGE_FS_ACCEL_PREFIX = os.getenv("IMAGE_FS_ACCEL_PREFIX", "/protected-images/")
+
+
+def is_content_addressed(filename: str) -> bool:
+    return bool(CONTENT_ADDRESSED_NAME.match(filename or ""))
+
+
+def cache_control_for(filename: str) -> str:
+    if is_content_addressed(filename):
+        return IMMUTABLE_CACHE_CONTROL
+    return f"public, max-age={IMAGE_MAX_AGE_SECONDS}"
+
+
+def _http_date(value):
+    """Naive UTC datetime from Mongo -> aware, second precision (as sent in headers)."""
+    if value is None:
+        return None
+    return value.replace(tzinfo=timezone.utc, microsecond=0)
+
+
+def _not_modified(etag, last_modified) -> bool:
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        return last_modified <= request.if_modified_since
+    return False
+
+
+def _apply_validators(resp, etag, last_modified, cache_control):
+    resp.set_etag(etag)
+    if last_modified is not None:
+        resp.last_modified = last_modified
+    resp.headers["Cache-Control"] = cache_control
+    return resp
+
+
+# =====================================
+#  GRIDFS STREAMING
+# =====================================
+def _iter_gridout(gridout, start, length):
+    """Yield ``length`` bytes from ``start`` one GridFS chunk at a time."""
+    try:
+        gridout.seek(start)
+        remaining = length
+        while remaining > 0:
+            data = gridout.read(min(gridout.chunk_size, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+    finally:
+        gridout.close()
+
+
+def _requested_range(total, etag=None):
+    """Return (start, stop) for a single satisfiable byte range, None for a full
+    response, or False when the range cannot be satisfied."""
+    byte_range = request.range
+    if byte_range is None or byte_range.units != "bytes" or len(byte_range.ranges) != 1:
+        return None
+    # If-Range: only honour the range when the client's copy is still current
+    if_range = request.if_range
+    if if_range.etag is not None and if_range.etag != etag:
+        return None
+    if if_range.date is not None:
+        return None
+    bounds = byte_range.range_for_length(total)
+    return bounds if bounds is not None else False
+
+
+def _range_response(total, mimetype, etag, make_body):
+    """Full or 206 partial response; ``make_body(start, length)`` yields the bytes."""
+    bounds = _requested_range(total, etag)
+    if bounds is False:
+        resp = Response(status=416)
+        resp.headers["Content-Range"] = f"bytes */{total}"
+        return resp
+
+    start, stop = bounds or (0, total)
+    resp = Response(
+        make_body(start, stop - start),
+        status=206 if bounds else 200,
+        mimetype=mimetype,
+        direct_passthrough=True,
+    )
+    resp.content_length = stop - start
+    resp.headers["Accept-Ranges"] = "bytes"
+    if bounds:
+        resp.headers["Content-Range"] = f"bytes {start}-{stop - 1}/{total}"
+    return resp
+
+
+def stream_gridout(gridout, mimetype, etag=None):
+    """Build a streaming (optionally 206 partial) response for a GridFS file.
+
+    Memory per request is bounded by the GridFS chunk size.
+    """
+    resp = _range_response(gridout.length, mimetype, etag,
+                           lambda start, length: _iter_gridout(gridout, start, length))
+    if resp.status_code == 416:
+        gridout.close()
+    return resp
+
+
+def bytes_response(data, mimetype, etag=None):
+    """Build a (optionally 206 partial) response for an in-memory image."""
+    return _range_response(len(data), mimetype, etag,
+                           lambda start, length: [data[start:start + length]])
+
+
+def _proxy_response(meta, key, path, cache_control):
+    """Empty response whose body the front proxy fills in from disk."""
+    resp = Response(status=200, mimetype=meta.content_type)
+    if IMAGE_FS_SERVE == "x-accel-redirect":
+        resp.headers["X-Accel-Redirect"] = IMAGE_FS_ACCEL_PREFIX.rstrip("/") + "/" + key
+    else:
+        resp.headers["X-Sendfile"] = path
+    return _apply_validators(resp, meta.etag, meta.last_modified, cache_control)
+
+
+def _file_response(meta, path, cache_control):
+    # send_file uses wsgi.file_wrapper (sendfile) and handles Range/If-Range itself
+    resp = send_file(path, mimetype=meta.content_type, etag=meta.etag,
+                     last_modified=meta.last_modified, conditional=True)
+    resp.headers["Cache-Control"] = cache_control
+    return resp
+
+
+# =====================================
+#  SERVING
+# =====================================
+def serve_image(filename):
+    """Serve an image stored in all_imgs by filename.
+
+    Lookups go memory tier -> disk tier -> storage backend. The ETag is the
+    GridFS upload id (a replaced file gets a new id) or the content-addressed
+    storage key, so conditional requests are answered with 304 before any
+    bytes are read.
+    """
+    cache_control = cache_control_for(filename)
+
+    cached = memory_tier.get(filename)
+    if cached is not None:
+        meta, data = cached
+        if _not_modified(meta.etag, meta.last_modified):
+            return _apply_validators(Response(status=304), meta.etag, meta.last_modified, cache_control)
+        return _apply_validators(bytes_response(data, meta.content_type, meta.etag),
+                                 meta.etag, meta.last_modified, cache_control)
+
+    on_disk = disk_tier.get(filename)
+    if on_disk is not None:
+        meta, path = on_disk
+        if _not_modified(meta.etag, meta.last_modified):
+            return _apply_validators(Response(status=304), meta.etag, meta.last_modified, cache_control)
+        return _file_response(meta, path, cache_control)
+
+    img_doc = AllImgs.objects(filename=filename).first()
+    if not img_doc:
+        raise AppError("Image not found", 404)
+    gridfs = img_doc.storage in (None, "gridfs")
+    if gridfs and not img_doc.file.grid_id:
+        raise AppError("Image not found", 404)
+
+    etag = str(img_doc.file.grid_id) if gridfs else img_doc.storage_key
+    last_modified = _http_date(img_doc.uploaded_at)
+    if _not_modified(etag, last_modified):
+        return _apply_validators(Response(status=304), etag, last_modified, cache_control)
+
+    content_type = img_doc.content_type or "image/jpeg"
+    ttl = IMAGE_CACHE_TTL if is_content_addressed(filename) else IMAGE_MUTABLE_CACHE_TTL
+
+    # Already on local disk: no cache tiers, serve it (or let the proxy) straight from there
+    if img_doc.storage == "filesystem":
+        path = get_backend("filesystem").path(img_doc.storage_key)
+        if not os.path.exists(path):
+            raise AppError("Image not found", 404)
+        meta = ImageMeta(etag, last_modified, content_type, img_doc.length)
+        if IMAGE_FS_SERVE in ("x-accel-redirect", "x-sendfile"):
+            return _proxy_response(meta, img_doc.storage_key, path, cache_control)
+        return _file_response(meta, path, cache_control)
+
+    if not gridfs:
+        # Remote object store: fetch once, then serve from the local tiers
+        data = read_blob(img_doc)
+        meta = ImageMeta(etag, last_modified, content_type, len(data))
+        return _cache_and_respond(filename, meta, data, ttl, cache_control)
+
+    gridout = img_doc.file.get()
+    if gridout is None:
+        raise AppError("Image not found", 404)
+    meta = ImageMeta(etag, last_modified, content_type, gridout.length)
+
+    # Small hot images: keep the bytes in memory and on disk
+    if meta.length <= IMAGE_MEMORY_MAX_ITEM_BYTES:
+        data = gridout.read()
+        gridout.close()
+        return _cache_and_respond(filename, meta, data, ttl, cache_control)
+
+    # Larger images: copy chunk by chunk to disk, then serve with sendfile
+    if meta.length <= disk_tier.max_item_bytes:
+        try:
+            path = disk_tier.put_stream(filename, meta, _iter_gridout(gridout, 0, meta.length), ttl)
+            return _file_response(meta, path, cache_control)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not write {filename} to image disk cache: {e}")
+            gridout = img_doc.file.get()
+
+    resp = stream_gridout(gridout, meta.content_type, etag)
+    return _apply_validators(resp, etag, last_modified, cache_control)
+
+
+def _cache_and_respond(filename, meta, data, ttl, cache_control):
+    """Serve bytes fetched from storage, keeping a copy in the memory and disk tiers."""
+    if meta.length <= IMAGE_MEMORY_MAX_ITEM_BYTES:
+        memory_tier.set(filename, (meta, data), ttl=ttl)
+    if meta.length <= disk_tier.max_item_bytes:
+        try:
+            path = disk_tier.put_stream(filename, meta, [data], ttl)
+            if meta.length > IMAGE_MEMORY_MAX_ITEM_BYTES:
+                return _file_response(meta, path, cache_control)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not write {filename} to image disk cache: {e}")
+    return _apply_validators(bytes_response(data, meta.content_type, meta.etag),
+                             meta.etag, meta.last_modified, cache_control)
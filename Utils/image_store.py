@@ -0,0 +1,282 @@
+import hashlib
+import hmac
+import logging
+import os
+import re
+import uuid
+from datetime import datetime
+from urllib.parse import quote, urlparse
+
+import httpx
+from mongoengine import NotUniqueError
+from werkzeug.utils import secure_filename
+
+from Models.allImgsModel import AllImgs
+
+logger = logging.getLogger(__name__)
+
+# =====================================
+#  CONFIGURATION
+# =====================================
+# Backend used for new uploads: gridfs | filesystem | s3 (existing files keep theirs)
+IMAGE_STORAGE_BACKEND = os.getenv("IMAGE_STORAGE_BACKEND", "gridfs")
+IMAGE_FS_ROOT = os.getenv("IMAGE_FS_ROOT", os.path.join("storage", "images"))
+IMAGE_S3_ENDPOINT = os.getenv("IMAGE_S3_ENDPOINT", "http://localhost:9000")
+IMAGE_S3_BUCKET = os.getenv("IMAGE_S3_BUCKET", "lostnfound-images")
+IMAGE_S3_REGION = os.getenv("IMAGE_S3_REGION", "us-east-1")
+IMAGE_S3_ACCESS_KEY = os.getenv("IMAGE_S3_ACCESS_KEY", "")
+IMAGE_S3_SECRET_KEY = os.getenv("IMAGE_S3_SECRET_KEY", "")
+
+# Never garbage collected
+PROTECTED_IMAGES = {"default.jpg"}
+# "<sha256>.<ext>" (or a variant "<sha256>__w<width>.<ext>"), as written by store_image
+# and image_variants; group 1 is the digest, group 2 the variant width (or None).
+# The one definition of a content-addressed name: serving, storage and GC all use it.
+CONTENT_ADDRESSED_NAME = re.compile(r"^([0-9a-f]{64})(?:__w(\d+))?\.[A-Za-z0-9]+$")
+
+
+# =====================================
+#  BACKENDS
+# =====================================
+class GridFSBackend:
+    """Bytes live in GridFS behind ``AllImgs.file`` (the original layout)."""
+
+    name = "gridfs"
+    # Each upload gets its own GridFS file, so a losing duplicate can drop its copy
+    content_addressed = False
+
+    def put(self, img_doc, data, mime_type):
+        img_doc.file.put(data, content_type=mime_type)
+        return None
+
+    def read(self, img_doc):
+        return img_doc.file.read()
+
+    def delete(self, img_doc):
+        img_doc.file.delete()
+
+
+class FilesystemBackend:
+    """Bytes live on local disk as ``<root>/<name[:2]>/<name>``.
+
+    Keys are derived from the (content-addressed) filename, so identical
+    uploads land on the same path and files can be served by the front proxy.
+    Every resolved path is checked to stay under the root.
+    """
+
+    name = "filesystem"
+    content_addressed = True
+
+    def __init__(self, root):
+        self.root = os.path.realpath(root)
+
+    def path(self, key):
+        path = os.path.realpath(os.path.join(self.root, *key.split("/")))
+        if os.path.commonpath([path, self.root]) != self.root:
+            raise ValueError(f"Storage key escapes the image root: {key!r}")
+        return path
+
+    @staticmethod
+    def key_for(filename):
+        """Content-addressed names map to ``<name[:2]>/<name>``; legacy client
+        filenames are sanitized and prefixed with a hash so they cannot collide
+        or point outside the root."""
+        if CONTENT_ADDRESSED_NAME.match(filename or ""):
+            return f"{filename[:2]}/{filename}"
+        digest = hashlib.sha256((filename or "").encode("utf-8")).hexdigest()
+        safe = secure_filename(filename or "") or "image"
+        return f"legacy/{digest[:2]}/{digest[:16]}_{safe}"
+
+    def put(self, img_doc, data, mime_type):
+        key = self.key_for(img_doc.filename)
+        path = self.path(key)
+        # Same content address means same bytes; legacy names may be replaced
+        if not os.path.exists(path) or not CONTENT_ADDRESSED_NAME.match(img_doc.filename):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return key
+
+    def read(self, img_doc):
+        with open(self.path(img_doc.storage_key), "rb") as f:
+            return f.read()
+
+    def delete(self, img_doc):
+        try:
+            os.remove(self.path(img_doc.storage_key))
+        except FileNotFoundError:
+            pass
+
+
+class S3Backend:
+    """Bytes live in an S3-compatible bucket (AWS, MinIO, ...), path-style
+    addressing with Signature V4."""
+
+    name = "s3"
+    content_addressed = True
+
+    def __init__(self, endpoint, bucket, region, access_key, secret_key):
+        self.endpoint = endpoint.rstrip("/")
+        self.bucket = bucket
+        self.region = region
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.host = urlparse(self.endpoint).netloc
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = httpx.Client(timeout=30.0)
+        return self._client
+
+    def _signed_headers(self, method, uri, payload_hash, extra=None):
+        now = datetime.utcnow()
+        amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+        datestamp = now.strftime("%Y%m%d")
+        headers = {"host": self.host, "x-amz-content-sha256": payload_hash, "x-amz-date": amz_date}
+        headers.update({k.lower(): v for k, v in (extra or {}).items()})
+
+        signed = ";".join(sorted(headers))
+        canonical_headers = "".join(f"{k}:{headers[k].strip()}\n" for k in sorted(headers))
+        canonical_request = "\n".join([method, uri, "", canonical_headers, signed, payload_hash])
+        scope = f"{datestamp}/{self.region}/s3/aws4_request"
+        string_to_sign = "\n".join([
+            "AWS4-HMAC-SHA256", amz_date, scope,
+            hashlib.sha256(canonical_request.encode()).hexdigest(),
+        ])
+
+        key = f"AWS4{self.secret_key}".encode()
+        for part in (datestamp, self.region, "s3", "aws4_request"):
+            key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+        signature = hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+
+        headers["authorization"] = (
+            f"AWS4-HMAC-SHA256 Credential={self.access_key}/{scope}, "
+            f"SignedHeaders={signed}, Signature={signature}"
+        )
+        del headers["host"]  # httpx sets it from the URL
+        return headers
+
+    def _request(self, method, key, data=b"", extra=None):
+        uri = f"/{self.bucket}/{quote(key, safe='/~')}"
+        headers = self._signed_headers(method, uri, hashlib.sha256(data).hexdigest(), extra)
+        return self.client.request(method, f"{self.endpoint}{uri}", content=data or None, headers=headers)
+
+    def put(self, img_doc, data, mime_type):
+        key = img_doc.filename
+        resp = self._request("PUT", key, data, {"content-type": mime_type})
+        resp.raise_for_status()
+        return key
+
+    def read(self, img_doc):
+        resp = self._request("GET", img_doc.storage_key)
+        resp.raise_for_status()
+        return resp.content
+
+    def delete(self, img_doc):
+        resp = self._request("DELETE", img_doc.storage_key)
+        if resp.status_code not in (200, 204, 404):
+            resp.raise_for_status()
+
+
+BACKENDS = {
+    "gridfs": GridFSBackend(),
+    "filesystem": FilesystemBackend(IMAGE_FS_ROOT),
+    "s3": S3Backend(IMAGE_S3_ENDPOINT, IMAGE_S3_BUCKET, IMAGE_S3_REGION,
+                    IMAGE_S3_ACCESS_KEY, IMAGE_S3_SECRET_KEY),
+}
+
+
+def get_backend(name=None):
+    try:
+        return BACKENDS[name or "gridfs"]
+    except KeyError:
+        raise ValueError(f"Unknown image storage backend: {name}")
+
+
+# =====================================
+#  BLOBS
+# =====================================
+def put_blob(img_doc, data: bytes, mime_type: str, backend=None):
+    """Write the bytes of an (unsaved) AllImgs document to a backend."""
+    backend = backend or get_backend(IMAGE_STORAGE_BACKEND)
+    img_doc.storage_key = backend.put(img_doc, data, mime_type)
+    img_doc.storage = backend.name
+    img_doc.length = len(data)
+
+
+def read_blob(img_doc) -> bytes:
+    return get_backend(img_doc.storage).read(img_doc)
+
+
+def delete_blob(img_doc):
+    get_backend(img_doc.storage).delete(img_doc)
+
+
+def discard_duplicate_blob(img_doc):
+    """Drop the blob of a document that lost a unique-filename race.
+
+    Content-addressed backends share the winner's key, which must be kept.
+    """
+    backend = get_backend(img_doc.storage)
+    if not backend.content_addressed:
+        backend.delete(img_doc)
+
+
+# =====================================
+#  CONTENT-ADDRESSED UPLOADS
+# =====================================
+def content_filename(data: bytes, ext: str) -> str:
+    return f"{hashlib.sha256(data).hexdigest()}.{ext}"
+
+
+def _claim_existing(filename):
+    """Reuse an already stored file; None if there is none.
+
+    ``filename`` is the content address (``<sha256>.<ext>``), so matching it
+    is matching the content hash; the unique index on it makes this exact.
+
+    Touching ``last_used_at`` keeps the orphan GC's grace period from
+    sweeping it before the new upload gets attached to something.
+    """
+    return AllImgs.objects(filename=filename).only('id', 'filename').modify(
+        set__last_used_at=datetime.utcnow()
+    )
+
+
+def to_signed64(value):
+    """Mongo stores int64; map an unsigned 64-bit hash onto it (and back)."""
+    return value - (1 << 64) if value is not None and value >= 1 << 63 else value
+
+
+def from_signed64(value):
+    return value + (1 << 64) if value is not None and value < 0 else value
+
+
+def store_image(data: bytes, mime_type: str, ext: str, hashes=None):
+    """Store processed image bytes under their content address.
+
+    An identical upload reuses the existing file.
+    ``hashes`` is an optional (dhash, phash) pair of unsigned 64-bit ints.
+    Returns (AllImgs document with id/filename, created).
+    """
+    filename = content_filename(data, ext)
+    existing = _claim_existing(filename)
+    if existing:
+        return existing, False
+
+    img_doc = AllImgs(filename=filename, content_type=mime_type)
+    if hashes:
+        img_doc.dhash, img_doc.phash = (to_signed64(h) for h in hashes)
+    put_blob(img_doc, data, mime_type)
+    try:
+        img_doc.save(force_insert=True)
+    except NotUniqueError:
+        # A concurrent upload of the same bytes won the insert; drop our blob
+        discard_duplicate_blob(img_doc)
+        return _claim_existing(filename), False
+    return img_doc, True
+
@@ -0,0 +1,104 @@
+import logging
+import os
+
+from flask import request
+from mongoengine import NotUniqueError
+
+from Models.allImgsModel import AllImgs
+from Utils.appError import AppError
+from Utils.image_processing import process_variant
+from Utils.image_response import serve_image
+from Utils.image_store import put_blob, read_blob, delete_blob, discard_duplicate_blob
+
+logger = logging.getLogger(__name__)
+
+# =====================================
+#  CONFIGURATION
+# =====================================
+# Only these widths are rendered, which bounds the number of stored variants per image
+IMAGE_VARIANT_WIDTHS = {
+    int(w) for w in os.getenv("IMAGE_VARIANT_WIDTHS", "100,200,400,800").split(",") if w.strip()
+}
+VARIANT_FORMATS = {
+    # fmt query value -> (Pillow format, extension, mime type)
+    "jpg": ("JPEG", "jpg", "image/jpeg"),
+    "jpeg": ("JPEG", "jpg", "image/jpeg"),
+    "png": ("PNG", "png", "image/png"),
+    "webp": ("WEBP", "webp", "image/webp"),
+}
+
+
+# =====================================
+#  VARIANTS
+# =====================================
+def variant_name(filename: str, width, ext: str) -> str:
+    stem = os.path.splitext(filename)[0]
+    return f"{stem}__w{width or 0}.{ext}"
+
+
+def _parse_variant_args():
+    """Read ?w=&fmt= and validate them against the whitelist. Returns (width, fmt)."""
+    raw_width = request.args.get("w")
+    raw_fmt = (request.args.get("fmt") or "").lower()
+    width = None
+    if raw_width:
+        try:
+            width = int(raw_width)
+        except ValueError:
+            raise AppError("Invalid image width", 400)
+        if width not in IMAGE_VARIANT_WIDTHS:
+            allowed = ", ".join(str(w) for w in sorted(IMAGE_VARIANT_WIDTHS))
+            raise AppError(f"Unsupported image width. Allowed: {allowed}", 400)
+    if raw_fmt and raw_fmt not in VARIANT_FORMATS:
+        raise AppError("Unsupported image format. Allowed: jpg, png, webp", 400)
+    return width, raw_fmt
+
+
+def create_variant(source_filename: str, name: str, width, fmt: str):
+    """Render and store a variant of ``source_filename`` under ``name`` (once)."""
+    source = AllImgs.objects(filename=source_filename, variant_of=None).first()
+    if not source:
+        raise AppError("Image not found", 404)
+
+    pil_format, ext, mime_type = VARIANT_FORMATS[fmt]
+    data = process_variant(read_blob(source), width, pil_format)
+
+    img_doc = AllImgs(filename=name, content_type=mime_type, variant_of=source_filename,
+                      variant=f"w{width or 0}.{ext}")
+    put_blob(img_doc, data, mime_type)
+    try:
+        img_doc.save()
+        logger.info(f"🖼️ Created image variant {name}")
+    except NotUniqueError:
+        # Another request rendered it first; drop our copy
+        discard_duplicate_blob(img_doc)
+
+
+def serve_upload(filename):
+    """Serve /uploads/<filename>, rendering ?w=<width>&fmt=<format> variants on demand."""
+    if "w" not in request.args and "fmt" not in request.args:
+        return serve_image(filename)
+
+    width, fmt = _parse_variant_args()
+    if not fmt:
+        # Keep the source format when only the width changes
+        fmt = os.path.splitext(filename)[1].lstrip(".").lower()
+        if fmt not in VARIANT_FORMATS:
+            fmt = "jpg"
+    name = variant_name(filename, width, VARIANT_FORMATS[fmt][1])
+    try:
+        return serve_image(name)
+    except AppError as e:
+        if e.status_code != 404:
+            raise
+    create_variant(filename, name, width, fmt)
+    return serve_image(name)
+
+
+def delete_variants(source_filename: str):
+    """Remove every stored variant of ``source_filename`` (after it was replaced)."""
+    from Utils.image_cache import invalidate_image
+    for variant in AllImgs.objects(variant_of=source_filename):
+        delete_blob(variant)
+        variant.delete()
+        invalidate_image(variant.filename)
@@ -1,9 +1,13 @@
 import jwt
+import hashlib
+import time
 from datetime import datetime, timedelta
 import os
 from dotenv import load_dotenv
 import os
 
+from Utils.cache import TTLCache
+
 load_dotenv()
 
 JWT_SECRET = os.getenv("JWT_SECRET", "default_secret")
@@ -11,24 +15,33 @@ JWT_ALGORITHM = "HS256"
 JWT_EXPIRES_IN_MINUTES = int(os.getenv("JWT_EXPIRES_IN_MINUTES", 60))
 JWT_REFRESH_EXPIRES_IN_DAYS = int(os.getenv("JWT_REFRESH_EXPIRES_IN_DAYS", 7))
 
-def create_access_token(user_id, role, expires_in_minutes=60):
+# Recently verified tokens, keyed by SHA-256 digest; entries never outlive the token's exp
+VERIFIED_TOKEN_CACHE_SIZE = int(os.getenv("VERIFIED_TOKEN_CACHE_SIZE", 4096))
+VERIFIED_TOKEN_CACHE_TTL = int(os.getenv("VERIFIED_TOKEN_CACHE_TTL", 300))
+verified_token_cache = TTLCache("verified_jwts", max_entries=VERIFIED_TOKEN_CACHE_SIZE, ttl=VERIFIED_TOKEN_CACHE_TTL)
+
+def create_access_token(user_id, role, expires_in_minutes=None, family_id=None):
     """
     Generate a JWT access token for a user.
+    ``family_id`` ties the token to its refresh-token family so logout can revoke it.
     """
     payload = {
         "user_id": str(user_id),
         "role": role,
-        "exp": datetime.utcnow() + timedelta(minutes=expires_in_minutes),
+        "exp": datetime.utcnow() + timedelta(minutes=expires_in_minutes or JWT_EXPIRES_IN_MINUTES),
         "iat": datetime.utcnow()
     }
+    if family_id:
+        payload["fam"] = family_id
 
     token = jwt.encode(payload, JWT_SECRET, algorithm="HS256")
     return token
 
 def create_refresh_token(data: dict):
-    """Generate a JWT refresh token."""
+    """Generate a JWT refresh token (``data`` carries user_id, role, jti and fam)."""
     payload = {
         **data,
+        "type": "refresh",
         "exp": datetime.utcnow() + timedelta(days=JWT_REFRESH_EXPIRES_IN_DAYS),
         "iat": datetime.utcnow()
     }
@@ -38,11 +51,28 @@ def decode_token(token):
     """
     Verify and decode a JWT token.
     Returns payload dict if valid, or None if invalid/expired.
+    Verified payloads are cached per worker so hot sessions skip the signature check.
     """
+    if not token:
+        return None
+    raw = token.encode("utf-8") if isinstance(token, str) else token
+    key = hashlib.sha256(raw).digest()
+
+    cached = verified_token_cache.get(key)
+    if cached is not None:
+        if cached.get("exp") is not None and cached["exp"] <= time.time():
+            verified_token_cache.pop(key)
+            return None
+        return dict(cached)
+
     try:
         decoded = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
-        return decoded
     except jwt.ExpiredSignatureError:
         return None
     except jwt.InvalidTokenError:
         return None
+
+    exp = decoded.get("exp")
+    ttl = exp - time.time() if exp is not None else None
+    verified_token_cache.set(key, decoded, ttl=ttl)
+    return dict(decoded)
@@ -0,0 +1,229 @@
+import gzip
+import hashlib
+import logging
+import os
+import threading
+from functools import wraps
+
+from flask import Response, make_response, request, session
+
+from Utils.cache import TTLCache, register_cache
+from Utils.pubsub import broadcast, on_broadcast
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# =====================================
+#  CONFIGURATION
+# =====================================
+PAGE_CACHE_ENABLED = os.getenv("PAGE_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+PAGE_CACHE_TTL = int(os.getenv("PAGE_CACHE_TTL", 300))
+PAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MAX_BYTES", 8 * 1024 * 1024))
+# Item pages change, so they are only held long enough to absorb a burst (1-5s)
+ITEM_MICRO_CACHE_TTL = min(max(float(os.getenv("ITEM_MICRO_CACHE_TTL", 2)), 1.0), 5.0)
+ITEM_MICRO_CACHE_MAX_BYTES = int(os.getenv("ITEM_MICRO_CACHE_MAX_BYTES", 16 * 1024 * 1024))
+
+
+class CachedPage:
+    """A rendered HTML page with its bodies precompressed once, at store time."""
+
+    __slots__ = ("bodies", "mimetype", "etag")
+
+    def __init__(self, html: bytes, mimetype: str, fast=False):
+        # Short-lived entries are recompressed every few seconds: trade ratio for speed
+        gzip_level, brotli_quality = (6, 5) if fast else (9, 11)
+        self.mimetype = mimetype
+        self.etag = hashlib.sha256(html).hexdigest()[:32]
+        self.bodies = {"identity": html, "gzip": gzip.compress(html, compresslevel=gzip_level)}
+        if brotli is not None:
+            self.bodies["br"] = brotli.compress(html, quality=brotli_quality)
+
+    @property
+    def size(self) -> int:
+        return sum(len(body) for body in self.bodies.values())
+
+
+# path -> CachedPage
+page_cache = TTLCache("pages", max_entries=256, ttl=PAGE_CACHE_TTL,
+                      max_bytes=PAGE_CACHE_MAX_BYTES, weigher=lambda page: page.size)
+item_page_cache = TTLCache("item_pages", max_entries=1024, ttl=ITEM_MICRO_CACHE_TTL,
+                           max_bytes=ITEM_MICRO_CACHE_MAX_BYTES, weigher=lambda page: page.size)
+
+
+# =====================================
+#  SINGLE-FLIGHT
+# =====================================
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one execution.
+
+    The first caller runs ``fn``; callers arriving while it is in flight
+    wait for it and share its result (or exception).
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            self.coalesced += 1
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        self.executions += 1
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            in_flight = len(self._calls)
+        return {"in_flight": in_flight, "executions": self.executions, "coalesced": self.coalesced}
+
+
+page_flights = register_cache("page_flights", SingleFlight())
+
+
+def _is_anonymous() -> bool:
+    return not (request.headers.get("Authorization")
+                or request.cookies.get("access_token")
+                or request.cookies.get("refresh_token"))
+
+
+def _cacheable_request() -> bool:
+    return (PAGE_CACHE_ENABLED and request.method in ("GET", "HEAD")
+            and _is_anonymous() and "_flashes" not in session)
+
+
+def _cacheable_response(resp) -> bool:
+    return (resp.status_code == 200 and resp.mimetype == "text/html"
+            and not resp.direct_passthrough and "Set-Cookie" not in resp.headers
+            and not session.modified)
+
+
+def _respond(page: CachedPage):
+    encoding = "identity"
+    for candidate in ("br", "gzip"):
+        if candidate in page.bodies and request.accept_encodings[candidate]:
+            encoding = candidate
+            break
+    # Each encoding is a different representation, so it gets its own validator
+    etag = page.etag if encoding == "identity" else f"{page.etag}-{encoding}"
+    if request.if_none_match.contains(etag):
+        resp = Response(status=304)
+    else:
+        resp = Response(page.bodies[encoding], mimetype=page.mimetype)
+        if encoding != "identity":
+            resp.headers["Content-Encoding"] = encoding
+    resp.set_etag(etag)
+    resp.vary.add("Accept-Encoding")
+    resp.vary.add("Cookie")
+    return resp
+
+
+def _serve_cached(cache, view, args, kwargs, fast=False):
+    """Cached page for the current path, rendering it at most once per worker at a time."""
+    if not _cacheable_request():
+        return view(*args, **kwargs)
+    key = request.path
+    page = cache.get(key)
+    if page is not None:
+        return _respond(page)
+
+    uncached = []  # the leader's own response when it cannot be shared
+
+    def render():
+        resp = make_response(view(*args, **kwargs))
+        if not _cacheable_response(resp):
+            uncached.append(resp)
+            return None
+        rendered = CachedPage(resp.get_data(), resp.mimetype, fast=fast)
+        cache.set(key, rendered)
+        return rendered
+
+    page = page_flights.do(f"{cache.name}:{key}", render)
+    if page is not None:
+        return _respond(page)
+    if uncached:
+        return uncached[0]
+    # The leader's response was not cacheable; render this request on its own
+    return view(*args, **kwargs)
+
+
+def cached_page(view):
+    """Serve anonymous GETs of ``view`` from the page cache, keyed by path.
+
+    Only for views whose output depends on nothing but the path: no user,
+    query string or per-request data. Requests with auth credentials or
+    pending flash messages always render.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        return _serve_cached(page_cache, view, args, kwargs)
+    return wrapper
+
+
+def micro_cached_page(view):
+    """Like ``cached_page`` but held for ITEM_MICRO_CACHE_TTL seconds only.
+
+    Meant for pages that change (item details): a burst of N concurrent
+    anonymous requests for one path costs one query and one render.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        return _serve_cached(item_page_cache, view, args, kwargs, fast=True)
+    return wrapper
+
+
+def _purge_local(path=None) -> int:
+    if path:
+        return 1 if page_cache.pop(path) is not None else 0
+    count = len(page_cache)
+    page_cache.clear()
+    logger.info(f"🧹 Page cache purged ({count} pages)")
+    return count
+
+
+@on_broadcast("pages.purge")
+def _on_purge(data):
+    _purge_local(data.get("path"))
+
+
+def purge_pages(path=None) -> int:
+    """Drop one cached path, or every cached page, in all workers.
+
+    Returns how many pages this worker removed; the others purge when the
+    broadcast reaches them.
+    """
+    purged = _purge_local(path)
+    broadcast("pages.purge", {"path": path})
+    return purged
@@ -0,0 +1,42 @@
+import base64
+from datetime import datetime
+
+from bson import ObjectId
+from mongoengine.queryset.visitor import Q
+
+from Utils.appError import AppError
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def page_size(raw, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE) -> int:
+    """Parse a ?limit= value, clamped to 1..maximum."""
+    if raw in (None, ""):
+        return default
+    try:
+        return max(1, min(int(raw), maximum))
+    except (TypeError, ValueError):
+        raise AppError("Invalid page size", 400)
+
+
+def encode_cursor(created_at: datetime, doc_id) -> str:
+    """Opaque keyset cursor for the last row of a page ordered by (-<datetime>, -_id)."""
+    raw = f"{created_at.isoformat()}|{doc_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """Return (created_at, ObjectId) or raise a 400."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, doc_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), ObjectId(doc_id)
+    except Exception:
+        raise AppError("Invalid cursor", 400)
+
+
+def after_cursor(cursor: str, field: str = "created_at") -> Q:
+    """Filter selecting rows that come after ``cursor`` in (-field, -_id) order."""
+    value, doc_id = decode_cursor(cursor)
+    return Q(**{f"{field}__lt": value}) | Q(**{field: value, "id__lt": doc_id})
@@ -0,0 +1,42 @@
+import os
+
+from bcrypt import hashpw, gensalt, checkpw
+
+from Utils.worker_pool import BoundedProcessPool
+
+# =====================================
+#  CONFIGURATION
+# =====================================
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+PASSWORD_POOL_WORKERS = int(os.getenv("PASSWORD_POOL_WORKERS", 2))
+PASSWORD_POOL_MAX_PENDING = int(os.getenv("PASSWORD_POOL_MAX_PENDING", 16))
+
+password_pool = BoundedProcessPool(
+    "password",
+    max_workers=PASSWORD_POOL_WORKERS,
+    max_pending=PASSWORD_POOL_MAX_PENDING,
+)
+
+
+# =====================================
+#  POOL TASKS (must stay top-level to be picklable)
+# =====================================
+def _bcrypt_hash(password: str, rounds: int) -> str:
+    return hashpw(password.encode('utf-8'), gensalt(rounds)).decode('utf-8')
+
+
+def _bcrypt_check(candidate_password: str, hashed: str) -> bool:
+    return checkpw(candidate_password.encode('utf-8'), hashed.encode('utf-8'))
+
+
+# =====================================
+#  PUBLIC HELPERS
+# =====================================
+def hash_password(password: str) -> str:
+    """Hash a password with bcrypt off the request thread (429 when saturated)."""
+    return password_pool.run(_bcrypt_hash, password, BCRYPT_ROUNDS)
+
+
+def check_password(candidate_password: str, hashed: str) -> bool:
+    """Verify a password against a bcrypt hash off the request thread."""
+    return password_pool.run(_bcrypt_check, candidate_password, hashed)
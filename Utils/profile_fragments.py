@@ -0,0 +1,126 @@
+import logging
+import os
+
+from bson import ObjectId
+from flask import render_template
+
+from Models.lostItemModel import LostItem
+from Models.messageModel import Message
+from Models.userModel import User
+from Utils.cache import TTLCache
+from Utils.hashid_utils import encode_object_id
+from Utils.pagination import encode_cursor, after_cursor
+
+logger = logging.getLogger(__name__)
+
+# =====================================
+#  CONFIGURATION
+# =====================================
+PROFILE_PAGE_SIZE = int(os.getenv("PROFILE_PAGE_SIZE", 20))
+PROFILE_FRAGMENT_TTL = int(os.getenv("PROFILE_FRAGMENT_TTL", 300))
+PROFILE_FRAGMENT_CACHE_BYTES = int(os.getenv("PROFILE_FRAGMENT_CACHE_BYTES", 16 * 1024 * 1024))
+
+# "<user id>:<content_version>:<fragment>:<args>" -> rendered HTML. A write
+# bumps the user's version, so stale fragments are never looked up again and
+# simply age out.
+fragment_cache = TTLCache(
+    "profile_fragments", max_entries=2048, ttl=PROFILE_FRAGMENT_TTL,
+    max_bytes=PROFILE_FRAGMENT_CACHE_BYTES, weigher=len,
+)
+
+
+def bump_content_version(*user_ids):
+    """Invalidate every cached profile fragment of these users (all workers)."""
+    ids = {str(getattr(u, "id", u)) for u in user_ids if u}
+    if ids:
+        User.objects(id__in=list(ids)).update(inc__content_version=1)
+
+
+# =====================================
+#  PAGE LOADERS
+# =====================================
+def listings_page(user_id, cursor=None, limit=PROFILE_PAGE_SIZE):
+    """One page of the user's active items, newest first, as template-ready dicts."""
+    qs = LostItem.objects(reported_by=user_id, is_active=True)
+    if cursor:
+        qs = qs.filter(after_cursor(cursor))
+    rows = list(
+        qs.order_by('-created_at', '-id')
+        .only('id', 'images', 'date_lost', 'status', 'category', 'sub_category',
+              'brand_breed', 'primary_color', 'secondary_color', 'created_at')
+        .limit(limit + 1)
+        .as_pymongo()
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    items = []
+    for r in rows:
+        id_str = str(r['_id'])
+        try:
+            slug = encode_object_id(r['_id'])
+        except Exception:
+            slug = id_str
+        items.append(dict(r, id_str=id_str, slug=slug))
+    next_cursor = encode_cursor(rows[-1]['created_at'], rows[-1]['_id']) if has_more and rows else None
+    return items, next_cursor
+
+
+def inbox_page(user_id, cursor=None, item_id=None, limit=PROFILE_PAGE_SIZE):
+    """One page of received messages with sender names resolved in one query."""
+    qs = Message.objects(receiver=user_id, deleted__ne=True, archived__ne=True)
+    if item_id:
+        qs = qs.filter(item=ObjectId(item_id))
+    if cursor:
+        qs = qs.filter(after_cursor(cursor))
+    rows = list(
+        qs.order_by('-created_at', '-id')
+        .only('id', 'sender', 'item', 'title', 'body', 'created_at', 'read')
+        .limit(limit + 1)
+        .as_pymongo()
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    from Utils.conversations import display_names  # conversations imports this module
+    senders = display_names({r['sender'] for r in rows if r.get('sender')})
+
+    messages = [{
+        "id": str(r['_id']),
+        "item_id": str(r['item']) if r.get('item') else '',
+        "sender_name": senders.get(r.get('sender'), 'Unknown'),
+        "title": r.get('title'),
+        "body": r.get('body'),
+        "created_at": r.get('created_at'),
+        "read": bool(r.get('read')),
+    } for r in rows]
+    next_cursor = encode_cursor(rows[-1]['created_at'], rows[-1]['_id']) if has_more and rows else None
+    return messages, next_cursor
+
+
+# =====================================
+#  FRAGMENTS
+# =====================================
+def _cached_fragment(user, name, args, render):
+    key = f"{user.id}:{user.content_version or 0}:{name}:{args}"
+    html = fragment_cache.get(key)
+    if html is None:
+        html = render()
+        fragment_cache.set(key, html)
+    return html
+
+
+def render_listings(user, cursor=None):
+    def render():
+        items, next_cursor = listings_page(user.id, cursor)
+        return render_template("profile_listings.html", lost_items=items,
+                               cursor=cursor, next_cursor=next_cursor)
+    return _cached_fragment(user, "listings", cursor or "", render)
+
+
+def render_inbox(user, cursor=None, item_id=None):
+    def render():
+        messages, next_cursor = inbox_page(user.id, cursor, item_id)
+        return render_template("profile_inbox.html", inbox=messages, cursor=cursor,
+                               next_cursor=next_cursor, item_id=item_id)
+    return _cached_fragment(user, "inbox", f"{item_id or ''}:{cursor or ''}", render)
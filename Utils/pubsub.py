@@ -0,0 +1,243 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid, PyMongoError
+
+from Utils.cache import register_cache
+
+logger = logging.getLogger(__name__)
+
+# =====================================
+#  CONFIGURATION
+# =====================================
+# local: events reach subscribers of this worker only (single worker / development)
+# mongo: events go through a capped collection that every worker tails
+# Defaults to mongo whenever more than one worker is configured (see gunicorn.conf.py)
+PUBSUB_BACKEND = os.getenv(
+    "PUBSUB_BACKEND", "mongo" if int(os.getenv("WEB_CONCURRENCY", 1)) > 1 else "local"
+)
+PUBSUB_COLLECTION = os.getenv("PUBSUB_COLLECTION", "pubsub_events")
+PUBSUB_CAPPED_BYTES = int(os.getenv("PUBSUB_CAPPED_BYTES", 16 * 1024 * 1024))
+SSE_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", 100))
+SSE_HEARTBEAT_SECONDS = int(os.getenv("SSE_HEARTBEAT_SECONDS", 25))
+# Streams end periodically so the browser reconnects and its token is checked again
+SSE_MAX_STREAM_SECONDS = int(os.getenv("SSE_MAX_STREAM_SECONDS", 300))
+
+
+# Channel of cluster-wide events (cache invalidations) handled by every worker
+BROADCAST_CHANNEL = "broadcast"
+
+
+def user_channel(user_id) -> str:
+    return f"user:{user_id}"
+
+
+# =====================================
+#  BROKERS
+# =====================================
+class LocalBroker:
+    """In-process fan-out: channel -> bounded queues of connected subscribers.
+
+    A subscriber that stops reading loses events once its queue is full
+    rather than blocking publishers.
+    """
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, channel):
+        q = queue.Queue(maxsize=SSE_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers[channel].add(q)
+        return q
+
+    def unsubscribe(self, channel, q):
+        with self._lock:
+            subscribers = self._subscribers.get(channel)
+            if subscribers:
+                subscribers.discard(q)
+                if not subscribers:
+                    del self._subscribers[channel]
+
+    def publish(self, channel, event_type, data):
+        self.published += 1
+        self.deliver(channel, {"type": event_type, "data": data})
+
+    def deliver(self, channel, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for q in subscribers:
+            try:
+                q.put_nowait(event)
+            except queue.Full:
+                self.dropped += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            channels = len(self._subscribers)
+            connections = sum(len(s) for s in self._subscribers.values())
+        return {"backend": "local", "channels": channels, "connections": connections,
+                "published": self.published, "dropped": self.dropped}
+
+
+class MongoBroker(LocalBroker):
+    """Cross-worker fan-out over a capped collection.
+
+    Publishing inserts one small document; each worker runs a single thread
+    tailing the collection with an awaitable cursor and hands matching events
+    to its local subscribers. Old events fall off the capped collection.
+    """
+
+    def __init__(self, collection_name, capped_bytes):
+        super().__init__()
+        self.collection_name = collection_name
+        self.capped_bytes = capped_bytes
+        self._tailer_pid = None
+        self._handlers = defaultdict(list)  # broadcast event type -> callbacks
+        self._handle = None  # (pid, collection)
+
+    def _collection(self):
+        """The capped collection, created (or found) once per process."""
+        pid = os.getpid()
+        handle = self._handle
+        if handle is not None and handle[0] == pid:
+            return handle[1]
+        with self._lock:
+            if self._handle is None or self._handle[0] != pid:
+                from mongoengine.connection import get_db
+                db = get_db()
+                try:
+                    db.create_collection(self.collection_name, capped=True, size=self.capped_bytes)
+                except CollectionInvalid:
+                    pass  # already exists
+                self._handle = (pid, db[self.collection_name])
+            return self._handle[1]
+
+    def subscribe(self, channel):
+        self._ensure_tailer()
+        return super().subscribe(channel)
+
+    def publish(self, channel, event_type, data):
+        self.published += 1
+        try:
+            self._collection().insert_one({"channel": channel, "type": event_type, "data": data})
+        except PyMongoError as e:
+            logger.warning(f"⚠️ Could not publish {event_type} event: {e}")
+
+    def _ensure_tailer(self):
+        pid = os.getpid()
+        if self._tailer_pid == pid:
+            return
+        with self._lock:
+            if self._tailer_pid == pid:
+                return
+            self._tailer_pid = pid
+        threading.Thread(target=self._tail, name="pubsub-tailer", daemon=True).start()
+
+    def _tail(self):
+        collection = self._collection()
+        newest = collection.find_one(sort=[("$natural", -1)], projection={"_id": 1})
+        last_id = newest["_id"] if newest else None
+        while True:
+            try:
+                # ObjectIds from different processes are not ordered, so resume by
+                # insertion (natural) order: replay the collection and skip up to
+                # the last doc handled. If it has rolled off, everything left is new.
+                skipping = last_id is not None and collection.find_one({"_id": last_id}, {"_id": 1}) is not None
+                cursor = collection.find(cursor_type=CursorType.TAILABLE_AWAIT)
+                while cursor.alive:
+                    for doc in cursor:
+                        if skipping:
+                            skipping = doc["_id"] != last_id
+                            continue
+                        last_id = doc["_id"]
+                        if doc["channel"] == BROADCAST_CHANNEL:
+                            self._dispatch(doc["type"], doc["data"])
+                        elif doc["channel"] in self._subscribers:
+                            self.deliver(doc["channel"], {"type": doc["type"], "data": doc["data"]})
+            except PyMongoError as e:
+                logger.warning(f"⚠️ Pub/sub tailer error, retrying: {e}")
+            time.sleep(1)
+
+    def on(self, event_type, handler):
+        self._handlers[event_type].append(handler)
+
+    def _dispatch(self, event_type, data):
+        for handler in self._handlers.get(event_type, ()):
+            try:
+                handler(data)
+            except Exception as e:
+                logger.warning(f"⚠️ Broadcast handler for {event_type} failed: {e}")
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats["backend"] = "mongo"
+        return stats
+
+
+broker = MongoBroker(PUBSUB_COLLECTION, PUBSUB_CAPPED_BYTES) if PUBSUB_BACKEND == "mongo" else LocalBroker()
+register_cache("pubsub", broker)
+# Cache invalidations must also reach other workers and come from CLI commands,
+# so they always go through the capped collection, whatever PUBSUB_BACKEND is.
+cluster = broker if isinstance(broker, MongoBroker) else MongoBroker(PUBSUB_COLLECTION, PUBSUB_CAPPED_BYTES)
+
+
+def publish_to_user(user_id, event_type, data):
+    """Push an event to every open stream of ``user_id`` (never raises)."""
+    try:
+        broker.publish(user_channel(user_id), event_type, data)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not publish {event_type} event: {e}")
+
+
+# =====================================
+#  BROADCASTS
+# =====================================
+def on_broadcast(event_type):
+    """Register ``handler(data)`` to run in every worker when ``event_type`` is broadcast."""
+    def register(handler):
+        cluster.on(event_type, handler)
+        return handler
+    return register
+
+
+def broadcast(event_type, data):
+    """Send an event to every listening worker, this one included (never raises)."""
+    try:
+        cluster.publish(BROADCAST_CHANNEL, event_type, data)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not broadcast {event_type}: {e}")
+
+
+def listen_for_broadcasts():
+    """Start this process's tailer if needed; called before each web request (cheap pid check)."""
+    cluster._ensure_tailer()
+
+
+# =====================================
+#  SERVER-SENT EVENTS
+# =====================================
+def event_stream(channel):
+    """Generator of SSE frames for ``channel``; unsubscribes when the client goes away."""
+    q = broker.subscribe(channel)
+    try:
+        yield "retry: 5000\n\n"
+        deadline = time.monotonic() + SSE_MAX_STREAM_SECONDS
+        while time.monotonic() < deadline:
+            try:
+                event = q.get(timeout=SSE_HEARTBEAT_SECONDS)
+            except queue.Empty:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: {event['type']}\ndata: {json.dumps(event['data'], default=str)}\n\n"
+    finally:
+        broker.unsubscribe(channel, q)
@@ -0,0 +1,75 @@
+import logging
+import secrets
+import uuid
+from datetime import datetime, timedelta
+
+from Models.refreshTokenModel import RefreshToken
+from Utils.appError import AppError
+from Utils.jwt_utils import create_refresh_token, decode_token, JWT_REFRESH_EXPIRES_IN_DAYS
+from Utils.revocation import revocations
+from Utils.user_cache import get_principal
+
+logger = logging.getLogger(__name__)
+
+
+def issue_refresh_token(user_id, role, family_id=None, jti=None):
+    """Persist and sign a new refresh token. Starts a new family unless one is given."""
+    family_id = family_id or uuid.uuid4().hex
+    jti = jti or secrets.token_hex(16)
+    RefreshToken(
+        jti=jti,
+        family_id=family_id,
+        user=user_id,
+        expires_at=datetime.utcnow() + timedelta(days=JWT_REFRESH_EXPIRES_IN_DAYS),
+    ).save(force_insert=True)
+    token = create_refresh_token({"user_id": str(user_id), "role": role, "jti": jti, "fam": family_id})
+    return token, family_id
+
+
+def rotate_refresh_token(token):
+    """Exchange a refresh token for a new one in the same family.
+
+    Presenting an already-rotated token is treated as theft: the whole family
+    is revoked and the caller has to log in again.
+    Returns (principal, new_refresh_token, family_id).
+    """
+    decoded = decode_token(token)
+    if not decoded or decoded.get("type") != "refresh" or not decoded.get("jti"):
+        raise AppError("Invalid or expired refresh token.", 401)
+
+    jti, family_id = decoded["jti"], decoded.get("fam")
+    if revocations.is_revoked(family_id):
+        raise AppError("Refresh token has been revoked.", 401)
+
+    next_jti = secrets.token_hex(16)
+    current = RefreshToken.objects(jti=jti, used=False, revoked=False).modify(
+        set__used=True, set__replaced_by=next_jti
+    )
+    if current is None:
+        if RefreshToken.objects(jti=jti).only('id').first():
+            logger.warning(f"🚨 Refresh token reuse detected for family {family_id}; revoking family")
+            revoke_family(family_id)
+            raise AppError("Refresh token reuse detected. Please log in again.", 401)
+        raise AppError("Invalid or expired refresh token.", 401)
+
+    principal = get_principal(decoded.get("user_id"))
+    if not principal or not principal.active:
+        revoke_family(family_id)
+        raise AppError("User not found.", 404)
+    if principal.changed_password_after(decoded.get("iat")):
+        revoke_family(family_id)
+        raise AppError("Password changed. Please log in again.", 401)
+
+    role_value = getattr(principal.role, "value", principal.role)
+    new_token, _ = issue_refresh_token(principal.id, role_value, family_id=family_id, jti=next_jti)
+    return principal, new_token, family_id
+
+
+def revoke_family(family_id):
+    """Revoke every refresh token (and, via ``fam``, access token) of a login session."""
+    if not family_id:
+        return 0
+    # DB first: a filter rebuild that starts after add() must already see the revocation
+    revoked = RefreshToken.objects(family_id=family_id, revoked=False).update(set__revoked=True)
+    revocations.add(family_id)
+    return revoked
@@ -0,0 +1,144 @@
+import hashlib
+import logging
+import math
+import os
+import threading
+import time
+from datetime import datetime
+
+from Utils.cache import TTLCache, register_cache
+from Utils.pubsub import broadcast, on_broadcast
+
+logger = logging.getLogger(__name__)
+
+# =====================================
+#  CONFIGURATION
+# =====================================
+REVOCATION_REBUILD_SECONDS = int(os.getenv("REVOCATION_REBUILD_SECONDS", 60))
+REVOCATION_FALSE_POSITIVE_RATE = float(os.getenv("REVOCATION_FALSE_POSITIVE_RATE", 0.01))
+
+
+# =====================================
+#  BLOOM FILTER
+# =====================================
+class BloomFilter:
+    """Fixed-size bloom filter over strings (double hashing on SHA-256)."""
+
+    def __init__(self, capacity, error_rate=REVOCATION_FALSE_POSITIVE_RATE):
+        capacity = max(1, capacity)
+        self.size = max(64, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value: str):
+        digest = hashlib.sha256(value.encode("utf-8")).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:16], "big") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, value: str):
+        for pos in self._positions(value):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, value: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(value))
+
+
+# =====================================
+#  REVOCATION LIST
+# =====================================
+class RevocationList:
+    """In-memory view of revoked refresh-token families.
+
+    A bloom filter rebuilt every ``REVOCATION_REBUILD_SECONDS`` from the
+    database holds all live revoked families; revocations made since the last
+    rebuild, by this worker or (via a broadcast) any other, are kept in an
+    exact set. Bloom negatives (the common case) need no database call; bloom
+    positives are confirmed once and remembered.
+    """
+
+    def __init__(self):
+        self._bloom = BloomFilter(0)
+        self._recent = {}  # family_id -> revoked_at (monotonic)
+        self._recent_lock = threading.Lock()
+        self._built_at = None
+        self._rebuild_lock = threading.Lock()
+        self._confirmed = TTLCache("revocation_confirmations", max_entries=4096, ttl=REVOCATION_REBUILD_SECONDS)
+        self.bloom_negatives = 0
+        self.db_confirmations = 0
+        register_cache("revocations", self)
+
+    def add(self, family_id: str):
+        """Record a revocation already written to the database (see rebuild),
+        in this worker and every other one."""
+        self.add_local(family_id)
+        broadcast("revocations.add", {"family_id": family_id})
+
+    def add_local(self, family_id: str):
+        with self._recent_lock:
+            self._recent[family_id] = time.monotonic()
+        self._confirmed.pop(family_id)
+
+    def is_revoked(self, family_id: str) -> bool:
+        if not family_id:
+            return False
+        self._maybe_rebuild()
+        if family_id in self._recent:
+            return True
+        if family_id not in self._bloom:
+            self.bloom_negatives += 1
+            return False
+
+        cached = self._confirmed.get(family_id)
+        if cached is None:
+            from Models.refreshTokenModel import RefreshToken
+            self.db_confirmations += 1
+            cached = RefreshToken.objects(family_id=family_id, revoked=True).only('id').first() is not None
+            self._confirmed.set(family_id, cached)
+        return cached
+
+    def _maybe_rebuild(self):
+        if self._built_at is not None and time.monotonic() - self._built_at < REVOCATION_REBUILD_SECONDS:
+            return
+        # Only one thread rebuilds; the others keep using the current filter
+        if not self._rebuild_lock.acquire(blocking=False):
+            return
+        try:
+            self.rebuild()
+        except Exception as e:
+            logger.error(f"❌ Failed to rebuild revocation filter: {e}")
+            self._built_at = time.monotonic()
+        finally:
+            self._rebuild_lock.release()
+
+    def rebuild(self):
+        from Models.refreshTokenModel import RefreshToken
+        started = time.monotonic()
+        families = RefreshToken.objects(revoked=True, expires_at__gt=datetime.utcnow()).distinct('family_id')
+        bloom = BloomFilter(len(families) * 2)
+        for family_id in families:
+            bloom.add(family_id)
+        self._bloom = bloom
+        # Revocations added before ``started`` were written to the DB before
+        # add(), so the snapshot has them; keep the ones that may have missed it
+        with self._recent_lock:
+            self._recent = {f: t for f, t in self._recent.items() if t >= started}
+        self._confirmed.clear()
+        self._built_at = time.monotonic()
+        logger.info(f"🛡️ Revocation filter rebuilt with {len(families)} families")
+
+    def stats(self) -> dict:
+        return {
+            "filter_bits": self._bloom.size,
+            "recent": len(self._recent),
+            "bloom_negatives": self.bloom_negatives,
+            "db_confirmations": self.db_confirmations,
+        }
+
+
+revocations = RevocationList()
+
+
+@on_broadcast("revocations.add")
+def _on_revocation(data):
+    revocations.add_local(data["family_id"])
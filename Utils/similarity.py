@@ -0,0 +1,184 @@
+import logging
+import os
+import threading
+import time
+from datetime import timedelta
+
+from Models.allImgsModel import AllImgs
+from Utils.cache import register_cache
+from Utils.image_store import from_signed64
+
+logger = logging.getLogger(__name__)
+
+# =====================================
+#  CONFIGURATION
+# =====================================
+# Max pHash hamming distance (out of 64) for two photos to count as similar
+SIMILAR_IMAGE_MAX_DISTANCE = int(os.getenv("SIMILAR_IMAGE_MAX_DISTANCE", 10))
+# New uploads are picked up incrementally; a full rebuild drops deleted images
+SIMILARITY_REFRESH_SECONDS = int(os.getenv("SIMILARITY_REFRESH_SECONDS", 60))
+SIMILARITY_REBUILD_SECONDS = int(os.getenv("SIMILARITY_REBUILD_SECONDS", 3600))
+# Incremental refreshes re-read this far behind the newest upload seen: uploaded_at
+# is stamped by the uploading worker before the insert lands, so rows can appear late
+SIMILARITY_OVERLAP_SECONDS = int(os.getenv("SIMILARITY_OVERLAP_SECONDS", 300))
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+# =====================================
+#  BK-TREE
+# =====================================
+class BKTree:
+    """Metric tree over 64-bit hashes under hamming distance.
+
+    Each node is ``[hash, values, {distance: child}]``. The triangle
+    inequality lets a radius search skip every subtree whose edge distance
+    is outside ``d ± radius``, so only a small fraction of nodes is visited.
+    """
+
+    def __init__(self):
+        self.root = None
+        self.size = 0
+
+    def add(self, value_hash: int, value):
+        if self.root is None:
+            self.root = [value_hash, {value}, {}]
+            self.size = 1
+            return
+        node = self.root
+        while True:
+            distance = hamming(value_hash, node[0])
+            if distance == 0:
+                node[1].add(value)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value_hash, {value}, {}]
+                self.size += 1
+                return
+            node = child
+
+    def search(self, value_hash: int, radius: int):
+        """Yield (distance, value) for every value within ``radius``."""
+        if self.root is None:
+            return
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            distance = hamming(value_hash, node[0])
+            if distance <= radius:
+                for value in node[1]:
+                    yield distance, value
+            for edge, child in node[2].items():
+                if distance - radius <= edge <= distance + radius:
+                    stack.append(child)
+
+
+# =====================================
+#  INDEX
+# =====================================
+class SimilarityIndex:
+    """Per-worker BK-tree of AllImgs pHashes (source images only).
+
+    Refreshes pick up uploads by ``uploaded_at`` with an overlapping window
+    (re-adding a known hash is a no-op); the periodic full rebuild catches
+    anything the window missed and drops deleted images.
+    """
+
+    def __init__(self, refresh_seconds, rebuild_seconds, overlap_seconds):
+        self.refresh_seconds = refresh_seconds
+        self.rebuild_seconds = rebuild_seconds
+        self.overlap = timedelta(seconds=overlap_seconds)
+        self._tree = BKTree()
+        self._newest = None  # latest uploaded_at seen
+        self._refreshed_at = 0.0
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+
+    def _fetch(self, since=None):
+        query = {"phash": {"$ne": None}, "variant_of": None}
+        if since is not None:
+            query["uploaded_at"] = {"$gte": since}
+        cursor = AllImgs._get_collection().find(query, {"filename": 1, "phash": 1, "uploaded_at": 1})
+        return [(row.get("uploaded_at"), from_signed64(row["phash"]), row["filename"]) for row in cursor]
+
+    def _sync(self):
+        now = time.monotonic()
+        if now - self._refreshed_at < self.refresh_seconds:
+            return
+        # Before the first build there is nothing to serve, so wait for it
+        # rather than answer from an empty tree; afterwards never block.
+        first_build = not self._built_at
+        if not self._sync_lock.acquire(blocking=first_build):
+            return  # another thread is already refreshing
+        try:
+            if first_build and self._built_at:
+                return  # built while we waited
+            if now - self._built_at >= self.rebuild_seconds:
+                tree, newest = BKTree(), None
+                for uploaded_at, value_hash, filename in self._fetch():
+                    tree.add(value_hash, filename)
+                    if uploaded_at and (newest is None or uploaded_at > newest):
+                        newest = uploaded_at
+                with self._lock:
+                    self._tree, self._newest = tree, newest
+                self._built_at = now
+                logger.info(f"🧭 Similarity index rebuilt ({tree.size} hashes)")
+            else:
+                since = self._newest - self.overlap if self._newest else None
+                rows = self._fetch(since)
+                with self._lock:
+                    for uploaded_at, value_hash, filename in rows:
+                        self._tree.add(value_hash, filename)
+                        if uploaded_at and (self._newest is None or uploaded_at > self._newest):
+                            self._newest = uploaded_at
+            self._refreshed_at = now
+        finally:
+            self._sync_lock.release()
+
+    def search(self, value_hash: int, radius: int = SIMILAR_IMAGE_MAX_DISTANCE):
+        self._sync()
+        with self._lock:
+            return list(self._tree.search(value_hash, radius))
+
+    def stats(self) -> dict:
+        return {"hashes": self._tree.size, "last_refresh_age": round(time.monotonic() - self._refreshed_at, 1)}
+
+
+similarity_index = SimilarityIndex(SIMILARITY_REFRESH_SECONDS, SIMILARITY_REBUILD_SECONDS,
+                                   SIMILARITY_OVERLAP_SECONDS)
+register_cache("similarity_index", similarity_index)
+
+
+def find_similar_items(item, limit=8):
+    """Other active lost items whose photos look like ``item``'s.
+
+    Returns [(distance, LostItem)] ordered by closest pHash distance.
+    """
+    from Models.lostItemModel import LostItem
+
+    own_images = {f for f in (item.images or []) if f}
+    if not own_images:
+        return []
+
+    closest = {}  # filename -> best distance to any of the item's photos
+    rows = AllImgs.objects(filename__in=list(own_images), phash__ne=None).only("phash").as_pymongo()
+    for row in rows:
+        for distance, filename in similarity_index.search(from_signed64(row["phash"])):
+            if distance < closest.get(filename, 65):
+                closest[filename] = distance
+    if not closest:
+        return []
+
+    candidates = LostItem.objects(
+        images__in=list(closest), id__ne=item.id, is_active=True
+    ).only("id", "title", "images", "status", "category", "city_town", "created_at")
+    scored = [
+        (min(closest[f] for f in candidate.images if f in closest), candidate)
+        for candidate in candidates
+    ]
+    scored.sort(key=lambda pair: pair[0])
+    return scored[:limit]
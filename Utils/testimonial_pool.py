@@ -0,0 +1,112 @@
+import logging
+import os
+import random
+import threading
+import time
+
+from Models.testimonialModel import Testimonial
+from Models.userModel import User
+from Utils.cache import register_cache
+from Utils.pubsub import broadcast, on_broadcast
+
+logger = logging.getLogger(__name__)
+
+# =====================================
+#  CONFIGURATION
+# =====================================
+TESTIMONIAL_POOL_REFRESH_SECONDS = int(os.getenv("TESTIMONIAL_POOL_REFRESH_SECONDS", 120))
+# Newest public testimonials kept per worker; random picks are drawn from these
+TESTIMONIAL_POOL_MAX = int(os.getenv("TESTIMONIAL_POOL_MAX", 1000))
+
+
+# =====================================
+#  POOL
+# =====================================
+class TestimonialPool:
+    """Per-worker snapshot of public testimonials, newest first.
+
+    Author name and photo are denormalized at load time, so serving random
+    or latest testimonials costs no query. The snapshot is reloaded every
+    ``refresh_seconds`` and after ``invalidate()`` (called on writes, in all workers).
+    """
+
+    def __init__(self, refresh_seconds, max_entries):
+        self.refresh_seconds = refresh_seconds
+        self.max_entries = max_entries
+        self._entries = ()
+        self._loaded_at = 0.0
+        self._stale = True
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def _load(self):
+        rows = list(
+            Testimonial.objects(is_public=True)
+            .order_by('-created_at')
+            .only('id', 'user', 'message', 'created_at')
+            .limit(self.max_entries)
+            .as_pymongo()
+        )
+        user_ids = {r['user'] for r in rows if r.get('user')}
+        users = {
+            u['_id']: u
+            for u in User.objects(id__in=list(user_ids)).only('name', 'photo').as_pymongo()
+        } if user_ids else {}
+
+        entries = []
+        for r in rows:
+            author = users.get(r.get('user'))
+            if not author:
+                continue  # author account is gone
+            entries.append({
+                "id": str(r['_id']),
+                "message": r.get('message'),
+                "user_name": author.get('name') or 'Anonymous',
+                "user_photo": author.get('photo') or 'default.jpg',
+                "created_at": r.get('created_at'),
+            })
+        return tuple(entries)
+
+    def _sync(self):
+        if not self._stale and time.monotonic() - self._loaded_at < self.refresh_seconds:
+            return
+        if not self._lock.acquire(blocking=False):
+            return  # another thread is reloading; serve the current snapshot
+        try:
+            self._stale = False
+            self._entries = self._load()
+            self._loaded_at = time.monotonic()
+            self.loads += 1
+        except Exception as e:
+            self._stale = True
+            logger.warning(f"⚠️ Could not load testimonial pool: {e}")
+        finally:
+            self._lock.release()
+
+    def invalidate(self):
+        """Reload on next use, in this worker and (via a broadcast) every other one."""
+        self._stale = True
+        broadcast("testimonials.invalidate", {})
+
+    def sample(self, limit):
+        """Up to ``limit`` distinct random testimonials."""
+        self._sync()
+        entries = self._entries
+        return random.sample(entries, min(max(limit, 0), len(entries)))
+
+    def latest(self, limit):
+        self._sync()
+        return list(self._entries[:max(limit, 0)])
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "loads": self.loads,
+                "age": round(time.monotonic() - self._loaded_at, 1)}
+
+
+testimonial_pool = TestimonialPool(TESTIMONIAL_POOL_REFRESH_SECONDS, TESTIMONIAL_POOL_MAX)
+register_cache("testimonial_pool", testimonial_pool)
+
+
+@on_broadcast("testimonials.invalidate")
+def _on_invalidate(data):
+    testimonial_pool._stale = True
@@ -0,0 +1,103 @@
+import os
+from calendar import timegm
+from collections import namedtuple
+
+from bson import ObjectId
+from mongoengine.base.datastructures import LazyReference
+
+from Utils.cache import TTLCache
+from Utils.pubsub import broadcast, on_broadcast
+
+# =====================================
+#  CONFIGURATION
+# =====================================
+USER_CACHE_TTL_SECONDS = int(os.getenv("USER_CACHE_TTL_SECONDS", 60))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", 4096))
+
+# Compact authorization data kept per worker, keyed by user_id (hex string).
+PrincipalData = namedtuple("PrincipalData", ["id", "role", "active", "password_changed_at"])
+# User fields whose change must reach every worker's cache at once
+PRINCIPAL_FIELDS = {"role", "active", "password", "password_changed_at"}
+
+principal_cache = TTLCache("principals", max_entries=USER_CACHE_MAX_ENTRIES, ttl=USER_CACHE_TTL_SECONDS)
+
+
+# =====================================
+#  PRINCIPAL
+# =====================================
+class Principal(LazyReference):
+    """Authenticated user handed to handlers by ``token_required``.
+
+    Carries only what authorization needs (id, role, active,
+    password_changed_at). Being a ``LazyReference`` it can be passed straight
+    into queries and ReferenceFields; any other User attribute or method
+    loads the full document on first access.
+    """
+
+    def __init__(self, data: PrincipalData):
+        from Models.userModel import User
+        super().__init__(User, data.id, passthrough=True)
+        self.role = data.role
+        self.active = data.active
+        self.password_changed_at = data.password_changed_at
+
+    def __getattr__(self, name):
+        document_type = object.__getattribute__(self, "document_type")
+        if name.startswith("__") or not (name in document_type._fields or hasattr(document_type, name)):
+            raise AttributeError(name)
+        return getattr(self.fetch(), name)
+
+    def changed_password_after(self, jwt_iat) -> bool:
+        """True if the password changed after the token was issued."""
+        if not self.password_changed_at or jwt_iat is None:
+            return False
+        return timegm(self.password_changed_at.utctimetuple()) > int(jwt_iat)
+
+
+# =====================================
+#  LOOKUP + INVALIDATION
+# =====================================
+def get_principal(user_id):
+    """Return a Principal for ``user_id`` from cache or a single projected query."""
+    user_id = str(user_id or "")
+    if not ObjectId.is_valid(user_id):
+        return None
+
+    data = principal_cache.get(user_id)
+    if data is None:
+        from Models.userModel import User, Role
+        raw = (User.objects(id=user_id)
+               .only("role", "active", "password_changed_at")
+               .as_pymongo()
+               .first())
+        if not raw:
+            return None
+        data = PrincipalData(
+            id=raw["_id"],
+            role=Role(raw.get("role", Role.USER.value)),
+            active=raw.get("active", True),
+            password_changed_at=raw.get("password_changed_at"),
+        )
+        principal_cache.set(user_id, data)
+    return Principal(data)
+
+
+@on_broadcast("principals.invalidate")
+def _on_invalidate(data):
+    for user_id in data.get("ids") or []:
+        principal_cache.pop(user_id)
+
+
+def invalidate_principal(user_id, everywhere=True):
+    """Drop the cached principal (call after any write to the user).
+
+    With ``everywhere`` the drop is broadcast to all workers, so a
+    deactivation, role change or password reset takes effect immediately;
+    a worker that misses the broadcast still expires the entry after
+    USER_CACHE_TTL_SECONDS.
+    """
+    if not user_id:
+        return
+    principal_cache.pop(str(user_id))
+    if everywhere:
+        broadcast("principals.invalidate", {"ids": [str(user_id)]})
@@ -0,0 +1,85 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from Utils.appError import AppError
+
+logger = logging.getLogger(__name__)
+
+WORKER_POOL_START_METHOD = os.getenv("WORKER_POOL_START_METHOD", "spawn")
+
+
+class BoundedProcessPool:
+    """Per-worker process pool for CPU-bound work with a hard queue-depth limit.
+
+    At most ``max_workers`` tasks run and ``max_pending`` wait; anything beyond
+    that is shed immediately with a 429 instead of queueing behind a burst.
+    ``max_workers=0`` runs tasks inline (useful for local development).
+    """
+
+    def __init__(self, name, max_workers, max_pending, timeout=30):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max(1, max_workers) + max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.rejected = 0
+
+    def _get_executor(self):
+        # Re-create after fork so each gunicorn worker owns its own children
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context(WORKER_POOL_START_METHOD),
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def run(self, fn, *args):
+        """Run ``fn(*args)`` in the pool and wait for its result."""
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            logger.warning(f"⏳ {self.name} pool saturated, shedding request")
+            raise AppError("Server is busy, please try again shortly.", 429)
+        try:
+            if self.max_workers <= 0:
+                result = fn(*args)
+            else:
+                try:
+                    future = self._get_executor().submit(fn, *args)
+                except BrokenProcessPool:
+                    with self._lock:
+                        self._executor = None
+                    future = self._get_executor().submit(fn, *args)
+                result = future.result(timeout=self.timeout)
+        except FutureTimeout:
+            self.timed_out += 1
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        else:
+            self.completed += 1
+            return result
+        finally:
+            self._slots.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timed_out": self.timed_out,
+            "rejected": self.rejected,
+        }
@@ -116,6 +116,10 @@ app.register_blueprint(search_routes)
 app.register_blueprint(message_routes)
 app.register_blueprint(api_testimonial_routes)
 
+# Each worker tails the pub/sub collection for cluster-wide cache invalidations
+from Utils.pubsub import listen_for_broadcasts
+app.before_request(listen_for_broadcasts)
+
 
 # ----------------------------
 # Logging Configuration
@@ -123,6 +127,15 @@ app.register_blueprint(api_testimonial_routes)
 from Utils.logger import setup_logging
 setup_logging(app)
 
+from Utils.benchmarks import register_benchmark_commands
+register_benchmark_commands(app)
+
+from Utils.image_gc import register_image_commands
+register_image_commands(app)
+
+from Utils.conversations import register_message_commands
+register_message_commands(app)
+
 # ----------------------------
 #   Global Error Handlers
 # ----------------------------
@@ -201,20 +214,10 @@ def ratelimit_handler(err):
 
 @app.route("/uploads/<filename>")
 def get_uploaded_image(filename):
-    from Models.allImgsModel import AllImgs
-    from Utils.appError import AppError
-    import io
-    from flask import send_file
-
-    img_doc = AllImgs.objects(filename=filename).first()
-    if not img_doc:
-        raise AppError("Image not found", 404)
-
-    gridout = img_doc.file.get()
-    return send_file(
-        io.BytesIO(gridout.read()),
-        mimetype=img_doc.content_type or "image/jpeg"
-    )
+    from Utils.image_variants import serve_upload
+
+    # Streams GridFS chunks; supports Range / 206 and ?w=&fmt= variants
+    return serve_upload(filename)
 
 
 # ----------------------------
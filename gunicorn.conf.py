@@ -0,0 +1,23 @@
+# gunicorn -c gunicorn.conf.py app:app
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '4000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", 2))
+
+# Cooperative workers: an idle Server-Sent Events connection (/api/v1/messages/stream)
+# is a parked greenlet, not a pinned OS thread, so each worker can hold many of them.
+# CPU-heavy work (bcrypt, image processing) already runs in process pools.
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gevent")
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", 1000))
+
+# Message events must reach streams held by every worker: the in-process broker
+# only fans out within one worker, so several workers need the mongo broker.
+os.environ.setdefault("PUBSUB_BACKEND", "mongo" if workers > 1 else "local")
+if workers > 1 and os.environ["PUBSUB_BACKEND"] == "local":
+    raise SystemExit("PUBSUB_BACKEND=local delivers events within one worker only; "
+                     "use PUBSUB_BACKEND=mongo or WEB_CONCURRENCY=1")
+
+# Streams end on their own after SSE_MAX_STREAM_SECONDS; this only bounds stuck requests
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 60))
+graceful_timeout = 30
+keepalive = 5
@@ -406,6 +406,46 @@ document.addEventListener("DOMContentLoaded", () => {
   // -------------------------
   // UI update after login
   // -------------------------
+function setUnreadBadge(unread) {
+  const badge = document.getElementById("unreadBadge");
+  if (!badge) return;
+  badge.textContent = unread > 99 ? "99+" : String(unread);
+  badge.style.display = unread > 0 ? "inline-block" : "none";
+}
+
+async function refreshUnreadBadge() {
+  if (!document.getElementById("unreadBadge")) return;
+  const token = localStorage.getItem("access_token");
+  try {
+    const resp = await fetch("/api/v1/messages/unread-count", {
+      headers: token ? { "Authorization": `Bearer ${token}` } : {},
+      credentials: "same-origin"
+    });
+    if (!resp.ok) return;
+    const json = await resp.json();
+    setUnreadBadge(json.unread || 0);
+  } catch (err) {
+    console.error(err);
+  }
+}
+
+let messageStream = null;
+
+// Live new-message / read-receipt events (cookie-authenticated Server-Sent Events)
+function startMessageStream() {
+  if (messageStream || !window.EventSource) return;
+  messageStream = new EventSource("/api/v1/messages/stream");
+  // Events for this user carry the new count; fall back to asking for it
+  const onEvent = (e) => {
+    let data = {};
+    try { data = JSON.parse(e.data); } catch {}
+    if (typeof data.unread === "number") setUnreadBadge(data.unread);
+    else refreshUnreadBadge();
+  };
+  messageStream.addEventListener("message", onEvent);
+  messageStream.addEventListener("read", onEvent);
+}
+
 function handleLoginSuccess(user) {
   const loginBtn = document.getElementById("loginBtn");
   const registerBtn = document.getElementById("registerBtn");
@@ -446,6 +486,9 @@ function handleLoginSuccess(user) {
       : "../images/default.jpg";
   }
 
+  refreshUnreadBadge();
+  startMessageStream();
+
   // ✅ Set profile link - admins go to admin page, others go to profile
   if (profileLink) {
     let userRole = user.role;